@@ -0,0 +1,124 @@
+import pandas as pd
+
+from compactacao import rotulo_mes
+
+# ==============================================================================
+# AGREGAÇÕES POR SEÇÃO DO DASHBOARD
+# ==============================================================================
+# Cada função recebe o motor de filtros e o estado do filtro e devolve só os
+# resultados pequenos que os gráficos da seção usam (nada de Plotly aqui).
+# O app.py chama apenas a função da seção visível, com cache por estado de filtro.
+# O dataset vem compactado (compactacao.py): dimensões categóricas e o mês como
+# inteiro na coluna 'mes'. Contagens de município, faixa etária, status vacinal
+# e resultado de teste saem dos índices bitmap do motor (contar_categoria).
+
+
+def _contagem(serie, top=None):
+    # value_counts de uma categórica também lista as categorias sem casos no filtro
+    contagem = serie.value_counts()
+    contagem = contagem[contagem > 0]
+    contagem.index = contagem.index.astype(object)
+    return contagem.head(top) if top else contagem
+
+
+def _por_mes(df, nome):
+    # Agrupa pelo índice inteiro do mês: os meses saem em ordem cronológica
+    contagem = df.groupby('mes').size()
+    return pd.DataFrame({'mes_ano': [rotulo_mes(m) for m in contagem.index], nome: contagem.to_numpy()})
+
+
+def visao_geral(motor, filtro):
+    df = motor.filtrar(filtro)
+    total_casos = len(df)
+    confirmados = int(df['target_confirmado'].sum())
+
+    # Casos por mês
+    casos_mes = _por_mes(df, 'total')
+    confirmados_mes = _por_mes(df[df['target_confirmado'] == 1], 'confirmados')
+
+    # Taxa de confirmação por mês
+    df_mes = pd.merge(casos_mes, confirmados_mes, on='mes_ano', how='left')
+    df_mes['taxa_confirmacao'] = (df_mes['confirmados'] / df_mes['total'] * 100).fillna(0)
+
+    return {
+        'total_casos': total_casos,
+        'confirmados': confirmados,
+        'casos_mes': casos_mes,
+        'confirmados_mes': confirmados_mes,
+        'df_mes': df_mes,
+        'top_municipios': motor.contar_categoria('municipio_nome', filtro, top=10),
+    }
+
+
+def demografia(motor, filtro):
+    df = motor.filtrar(filtro)
+    return {
+        'sexo_counts': _contagem(df['sexo']),
+        'faixa_counts': motor.contar_categoria('faixa_etaria', filtro),
+        'raca_counts': _contagem(df['raca_cor'], top=10),
+        'ocupacao_counts': _contagem(df['categoria_ocupacao']),
+    }
+
+
+def vacinacao(motor, filtro):
+    df = motor.filtrar(filtro)
+    status_counts = motor.contar_categoria('status_vacinal', filtro)
+
+    # Status vacinal vs confirmação
+    status_vacinal_data = df.groupby(['status_vacinal', 'target_confirmado'], observed=True).size().reset_index(name='count')
+
+    # Taxa de confirmação por status vacinal
+    taxa_vacina = df.groupby('status_vacinal', observed=True).agg({
+        'target_confirmado': ['count', 'sum']
+    }).round(2)
+    taxa_vacina.columns = ['total', 'confirmados']
+    taxa_vacina['taxa'] = (taxa_vacina['confirmados'] / taxa_vacina['total'] * 100).round(1)
+    taxa_vacina = taxa_vacina.reset_index()
+
+    return {
+        'nao_vacinados': int(status_counts.get('Não Vacinado', 0)),
+        'esquema_completo': int(status_counts.get('Esquema Completo', 0)),
+        'parcial': int(status_counts.get('Parcial', 0)),
+        'status_vacinal_data': status_vacinal_data,
+        # Cada fabricante conta uma vez por caso (e não a combinação 'A / B' inteira)
+        'fabricantes_counts': motor.contar_multivalor('fabricantes_vacina', filtro, top=10),
+        'taxa_vacina': taxa_vacina,
+    }
+
+
+def testes(motor, filtro):
+    df = motor.filtrar(filtro)
+    total_testes = int(df['testes_realizados'].sum())
+    resultados_counts = motor.contar_categoria('resultado_teste_agregado', filtro)
+    positivos = int(resultados_counts.get('Positivo', 0))
+
+    return {
+        'total_testes': total_testes,
+        'positivos': positivos,
+        'taxa_positividade': (positivos / total_testes * 100) if total_testes > 0 else 0,
+        # Listas decodificadas no carregamento (índice CSR): contagem vetorizada
+        'tipos_counts': motor.contar_multivalor('tipos_testes_lista', filtro, top=10),
+        'fabricantes_counts': motor.contar_multivalor('fabricantes_teste_lista', filtro, top=10),
+        'resultados_counts': resultados_counts,
+    }
+
+
+def mapa(motor, filtro):
+    municipio_casos = motor.contar_categoria('municipio_nome', filtro, top=20).reset_index()
+    municipio_casos.columns = ['municipio', 'casos']
+
+    return {
+        'municipio_casos': municipio_casos,
+        # Sintomas mais frequentes de sintomas_texto (até MAX_SINTOMAS), a partir das contagens por município x mês
+        'corr_matrix': motor.correlacao_sintomas(filtro),
+        'total_sintomas': motor.total_sintomas,
+    }
+
+
+AGREGACOES = {
+    'visao_geral': visao_geral,
+    'demografia': demografia,
+    'vacinacao': vacinacao,
+    'testes': testes,
+    'mapa': mapa,
+}
@@ -5,9 +5,27 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
+import os
+import json
+import time
 import warnings
+from motor_filtros import MotorFiltros
+from recarga_dataset import DatasetMonitorado
+from cache_figuras import CacheFiguras
+from coocorrencia import MAX_SINTOMAS
+from perfilamento import Perfilador
+import agregacoes
+import backend_duckdb
+import modelo_confirmacao
 warnings.filterwarnings('ignore')
 
+ARQUIVO_DATASET = 'df_padronizado_para_o_dash.csv'
+
+# Backend das agregações: 'pandas' (padrão, dataset em memória), 'duckdb'
+# (consultas SQL sobre Parquet, só o resultado agregado vem para o pandas) ou
+# 'banco' (ao vivo, direto das views do PostgreSQL; ver backend_banco.py)
+BACKEND = os.getenv('DASHBOARD_BACKEND', 'pandas').lower()
+
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard Epidemiológico - Pará",
@@ -16,24 +34,51 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Carregar os dados
-@st.cache_data
-def load_data():
-    df = pd.read_csv('df_padronizado_para_o_dash.csv', sep=';', encoding='utf-8')
-    
-    # Converter datas
-    date_cols = ['data_notificacao', 'data_inicio_sintomas']
-    for col in date_cols:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-    
-    # Criar coluna de ano-mês para agrupamento
-    df['ano_mes'] = df['data_notificacao'].dt.strftime('%Y-%m')
-    df['mes_ano'] = df['data_notificacao'].dt.strftime('%m/%Y')
-    
-    return df
+# cache_resource: um único backend por processo, compartilhado por todas as
+# sessões, sem a cópia que o cache_data faz a cada rerun. No modo pandas é o
+# dataset monitorado (recarga_dataset.py), que troca o motor quando o CSV muda.
+@st.cache_resource
+def carregar_backend():
+    if BACKEND == 'duckdb':
+        return backend_duckdb.BackendDuckDB(ARQUIVO_DATASET, threads=os.getenv('DASHBOARD_DUCKDB_THREADS'))
+    if BACKEND == 'banco':
+        return backend_banco.BackendBanco()
+    return DatasetMonitorado(
+        ARQUIVO_DATASET,
+        padrao_particoes=os.getenv('DASHBOARD_PARTICOES'),
+        intervalo=int(os.getenv('DASHBOARD_RECARGA_INTERVALO', '30')),
+    )
+
+# TTL dos caches do Streamlit: sem versão dos dados no modo banco (ao vivo), os
+# resultados expiram junto com o cache do backend (DASHBOARD_CACHE_TTL)
+TTL_CACHE = None
+
+if BACKEND == 'banco':
+    # Import só neste modo: exige sqlalchemy/psycopg2 e lê as credenciais do .env
+    import backend_banco
+    AGREGACOES = backend_banco.AGREGACOES
+    TTL_CACHE = backend_banco.TTL_PADRAO
+elif BACKEND == 'duckdb':
+    AGREGACOES = backend_duckdb.AGREGACOES
+else:
+    AGREGACOES = agregacoes.AGREGACOES
+
+# Perfilamento opcional (?perfil=1 na URL ou DASHBOARD_PERFIL=1): tempo de cada
+# etapa do rerun na sidebar, exportável em JSON (perfilamento.py)
+perfil = Perfilador(
+    ativo=os.getenv('DASHBOARD_PERFIL') == '1' or st.query_params.get('perfil') == '1',
+    backend=BACKEND
+)
+etapa_carga = perfil.marcar("carga do backend")
+
+backend = carregar_backend()
 
-df = load_data()
+# Motor e versão dos dados fixos durante o rerun inteiro (a recarga troca os dois juntos)
+if isinstance(backend, DatasetMonitorado):
+    motor, versao_dados = backend.atual()
+    etapa_carga['linhas'] = len(motor.df)
+else:
+    motor, versao_dados = backend, 0
 
 # Título e descrição
 st.title("🦠 Dashboard Epidemiológico - COVID-19 Pará")
@@ -42,66 +87,158 @@ st.markdown("""
     Use os filtros na barra lateral para explorar os dados.
 """)
 
+perfil.marcar("sidebar e filtros")
+
 # Sidebar com filtros
 st.sidebar.header("🔍 Filtros")
 
 # Filtro por município
-municipios = sorted(df['municipio_nome'].dropna().unique())
+municipios = motor.municipios
 municipio_selecionado = st.sidebar.multiselect(
     "Municípios", 
     municipios, 
-    default=["Tucuruí", "Belém", "Conceição do Araguaia"]
+    default=[m for m in ["Tucuruí", "Belém", "Conceição do Araguaia"] if m in municipios]
 )
 
 # Filtro por período
-if not df['data_notificacao'].isnull().all():
-    min_date = df['data_notificacao'].min()
-    max_date = df['data_notificacao'].max()
+start_date, end_date = None, None
+if motor.tem_datas:
+    min_date = motor.data_min
+    max_date = motor.data_max
     
     date_range = st.sidebar.date_input(
         "Período",
-        [min_date.date(), max_date.date()],
-        min_value=min_date.date(),
-        max_value=max_date.date()
+        [min_date, max_date],
+        min_value=min_date,
+        max_value=max_date
     )
     
     if len(date_range) == 2:
         start_date, end_date = date_range
-        df_filtrado = df[
-            (df['data_notificacao'].dt.date >= start_date) &
-            (df['data_notificacao'].dt.date <= end_date)
-        ]
+
+# Relatório de memória (só o backend pandas mantém o dataset no processo)
+if isinstance(motor, MotorFiltros):
+    memoria = motor.uso_memoria()
+    with st.sidebar.expander(f"💾 Memória do dataset: {memoria.sum():.1f} MB"):
+        st.dataframe(memoria.rename('MB').round(2), use_container_width=True)
+
+# Estado do filtro: o motor aplica (busca binária na data + códigos de município)
+# e guarda em cache a seleção; a filtragem só acontece quando uma seção precisa
+filtro = motor.criar_filtro(municipio_selecionado, start_date, end_date)
+
+# Agregações por seção: só a seção visível é calculada, e o resultado fica em
+# cache por estado de filtro e versão dos dados (compartilhado entre sessões).
+# _motor não entra na chave de cache (prefixo _ do Streamlit).
+@st.cache_data(max_entries=64, ttl=TTL_CACHE, show_spinner=False)
+def agregar(secao, filtro, versao_dados, _motor):
+    # None: a seção não tem fonte de dados no backend atual (ex.: Demografia no modo banco)
+    if secao not in AGREGACOES:
+        return None
+    # Só roda quando o resultado não está em cache
+    with perfil.etapa("cálculo (fora do cache)"):
+        return AGREGACOES[secao](_motor, filtro)
+
+def agregar_secao(secao):
+    with perfil.etapa(f"agregação: {secao}") as etapa:
+        dados = agregar(secao, filtro, versao_dados, motor)
+        if perfil.ativo and isinstance(motor, MotorFiltros):
+            etapa['linhas'] = len(motor.linhas(filtro))
+    return dados
+
+# Figuras prontas compartilhadas entre sessões (cache_figuras.py), por gráfico,
+# estado do filtro e versão dos dados
+@st.cache_resource
+def carregar_cache_figuras():
+    return CacheFiguras(
+        max_figuras=int(os.getenv('DASHBOARD_CACHE_FIGURAS', '256')),
+        max_mb=int(os.getenv('DASHBOARD_CACHE_FIGURAS_MB', '64')),
+    )
+
+def figura(id_grafico, construir):
+    # construir() só roda se a figura ainda não estiver em cache para este filtro/versão.
+    # No modo banco não há versão dos dados: a chave leva a janela do TTL, para a
+    # figura expirar junto com as agregações
+    janela = int(time.time() // max(TTL_CACHE, 1)) if TTL_CACHE is not None else 0
+    return carregar_cache_figuras().obter((id_grafico, filtro, versao_dados, janela), construir)
+
+def grafico(id_grafico, construir):
+    with perfil.etapa(f"gráfico: {id_grafico}", cache="acerto") as etapa:
+        def construir_medindo():
+            etapa['cache'] = "falta"
+            with perfil.etapa("montagem da figura"):
+                return construir()
+        
+        fig = figura(id_grafico, construir_medindo)
+        
+        with perfil.etapa("st.plotly_chart (serialização)"):
+            st.plotly_chart(fig, use_container_width=True)
+
+# Modelo preditivo treinado offline (python modelo_confirmacao.py), carregado uma
+# vez por processo. Sem o artefato o simulador usa os ajustes fixos de antes.
+@st.cache_resource
+def carregar_modelo():
+    if not os.path.exists(modelo_confirmacao.ARQUIVO_MODELO):
+        return None
+    try:
+        return modelo_confirmacao.ModeloConfirmacao.carregar()
+    except ValueError as e:
+        print(f"[AVISO] {e}")
+        return None
+
+# Faixas de 5% para o histograma de risco
+FAIXAS_RISCO = np.linspace(0, 1, 21)
+
+@st.cache_data(max_entries=64, ttl=TTL_CACHE, show_spinner=False)
+def distribuicao_risco(filtro, versao_dados, _motor):
+    if isinstance(_motor, MotorFiltros):
+        df = _motor.filtrar(filtro)
+    elif BACKEND == 'duckdb':
+        df = _motor.selecionar(filtro, modelo_confirmacao.COLUNAS)
     else:
-        df_filtrado = df.copy()
-else:
-    df_filtrado = df.copy()
-
-# Filtrar por municípios selecionados
-if municipio_selecionado:
-    df_filtrado = df_filtrado[df_filtrado['municipio_nome'].isin(municipio_selecionado)]
-
-# Layout principal com tabs
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "📈 Visão Geral", 
-    "👥 Demografia", 
-    "💉 Vacinação", 
-    "🧪 Testes", 
-    "🗺️ Mapa", 
-    "📊 Modelo Preditivo"
-])
-
-# TAB 1: VISÃO GERAL
-with tab1:
+        return None
+    
+    # Todas as notificações filtradas em uma única chamada vetorizada
+    probabilidades = carregar_modelo().probabilidades(df)
+    contagem, _ = np.histogram(probabilidades, bins=FAIXAS_RISCO)
+    
+    return {
+        'total': len(probabilidades),
+        'media': float(probabilidades.mean()) if len(probabilidades) else 0.0,
+        'alto_risco': int((probabilidades >= 0.6).sum()),
+        'faixas': pd.DataFrame({'risco': (FAIXAS_RISCO[:-1] + 0.025) * 100, 'casos': contagem}),
+    }
+
+# Layout principal por seções (st.tabs executaria o código de todas as abas a cada rerun)
+secao = st.radio(
+    "Seção",
+    [
+        "📈 Visão Geral", 
+        "👥 Demografia", 
+        "💉 Vacinação", 
+        "🧪 Testes", 
+        "🗺️ Mapa", 
+        "📊 Modelo Preditivo"
+    ],
+    horizontal=True,
+    label_visibility="collapsed",
+    key="secao"
+)
+
+perfil.marcar(f"seção: {secao}")
+
+# SEÇÃO 1: VISÃO GERAL
+if secao == "📈 Visão Geral":
+    dados = agregar_secao('visao_geral')
     st.header("Evolução Temporal dos Casos")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_casos = len(df_filtrado)
+        total_casos = dados['total_casos']
         st.metric("Total de Notificações", f"{total_casos:,}")
     
     with col2:
-        confirmados = df_filtrado['target_confirmado'].sum()
+        confirmados = dados['confirmados']
         st.metric("Casos Confirmados", f"{confirmados:,}")
     
     with col3:
@@ -109,406 +246,473 @@ with tab1:
         st.metric("Taxa de Confirmação", f"{taxa_confirmacao:.1f}%")
     
     # Gráfico de evolução temporal
-    fig_temporal = make_subplots(
-        rows=2, cols=1,
-        subplot_titles=('Casos por Mês', 'Taxa de Confirmação por Mês'),
-        vertical_spacing=0.15,
-        row_heights=[0.7, 0.3]
-    )
-    
-    # Casos por mês
-    casos_mes = df_filtrado.groupby('mes_ano').size().reset_index(name='total')
-    confirmados_mes = df_filtrado[df_filtrado['target_confirmado'] == 1].groupby('mes_ano').size().reset_index(name='confirmados')
-    
-    fig_temporal.add_trace(
-        go.Bar(
-            x=casos_mes['mes_ano'],
-            y=casos_mes['total'],
-            name='Total Notificações',
-            marker_color='lightblue'
-        ),
-        row=1, col=1
-    )
-    
-    fig_temporal.add_trace(
-        go.Bar(
-            x=confirmados_mes['mes_ano'],
-            y=confirmados_mes['confirmados'],
-            name='Confirmados',
-            marker_color='red'
-        ),
-        row=1, col=1
-    )
-    
-    # Taxa de confirmação por mês
-    df_mes = pd.merge(casos_mes, confirmados_mes, on='mes_ano', how='left')
-    df_mes['taxa_confirmacao'] = (df_mes['confirmados'] / df_mes['total'] * 100).fillna(0)
-    
-    fig_temporal.add_trace(
-        go.Scatter(
-            x=df_mes['mes_ano'],
-            y=df_mes['taxa_confirmacao'],
-            name='Taxa Confirmação',
-            mode='lines+markers',
-            line=dict(color='green', width=3),
-            yaxis='y2'
-        ),
-        row=2, col=1
-    )
-    
-    fig_temporal.update_layout(
-        height=600,
-        showlegend=True,
-        xaxis_title="Mês/Ano",
-        yaxis_title="Número de Casos",
-        yaxis2_title="Taxa (%)",
-        hovermode='x unified'
-    )
+    def construir_fig_temporal():
+        fig_temporal = make_subplots(
+            rows=2, cols=1,
+            subplot_titles=('Casos por Mês', 'Taxa de Confirmação por Mês'),
+            vertical_spacing=0.15,
+            row_heights=[0.7, 0.3]
+        )
+        
+        # Casos por mês
+        casos_mes = dados['casos_mes']
+        confirmados_mes = dados['confirmados_mes']
+        
+        fig_temporal.add_trace(
+            go.Bar(
+                x=casos_mes['mes_ano'],
+                y=casos_mes['total'],
+                name='Total Notificações',
+                marker_color='lightblue'
+            ),
+            row=1, col=1
+        )
+        
+        fig_temporal.add_trace(
+            go.Bar(
+                x=confirmados_mes['mes_ano'],
+                y=confirmados_mes['confirmados'],
+                name='Confirmados',
+                marker_color='red'
+            ),
+            row=1, col=1
+        )
+        
+        # Taxa de confirmação por mês
+        df_mes = dados['df_mes']
+        
+        fig_temporal.add_trace(
+            go.Scatter(
+                x=df_mes['mes_ano'],
+                y=df_mes['taxa_confirmacao'],
+                name='Taxa Confirmação',
+                mode='lines+markers',
+                line=dict(color='green', width=3),
+                yaxis='y2'
+            ),
+            row=2, col=1
+        )
+        
+        fig_temporal.update_layout(
+            height=600,
+            showlegend=True,
+            xaxis_title="Mês/Ano",
+            yaxis_title="Número de Casos",
+            yaxis2_title="Taxa (%)",
+            hovermode='x unified'
+        )
+        return fig_temporal
     
-    st.plotly_chart(fig_temporal, use_container_width=True)
+    grafico('temporal', construir_fig_temporal)
     
     # Top 10 municípios
     st.subheader("Top 10 Municípios por Número de Casos")
     
-    top_municipios = df_filtrado['municipio_nome'].value_counts().head(10)
-    
-    fig_top = px.bar(
-        x=top_municipios.index,
-        y=top_municipios.values,
-        labels={'x': 'Município', 'y': 'Número de Casos'},
-        color=top_municipios.values,
-        color_continuous_scale='Viridis'
-    )
-    
-    fig_top.update_layout(
-        xaxis_tickangle=-45,
-        height=400
-    )
-    
-    st.plotly_chart(fig_top, use_container_width=True)
-
-# TAB 2: DEMOGRAFIA
-with tab2:
-    st.header("Distribuição Demográfica dos Casos")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Distribuição por sexo
-        st.subheader("📊 Distribuição por Sexo")
-        sexo_counts = df_filtrado['sexo'].value_counts()
-        
-        fig_sexo = px.pie(
-            values=sexo_counts.values,
-            names=sexo_counts.index,
-            hole=0.4,
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        
-        st.plotly_chart(fig_sexo, use_container_width=True)
+    top_municipios = dados['top_municipios']
     
-    with col2:
-        # Distribuição por faixa etária
-        st.subheader("👶👨👴 Distribuição por Faixa Etária")
-        faixa_counts = df_filtrado['faixa_etaria'].value_counts()
-        
-        fig_faixa = px.bar(
-            x=faixa_counts.index,
-            y=faixa_counts.values,
-            labels={'x': 'Faixa Etária', 'y': 'Número de Casos'},
-            color=faixa_counts.values,
-            color_continuous_scale='Blues'
+    def construir_fig_top():
+        fig_top = px.bar(
+            x=top_municipios.index,
+            y=top_municipios.values,
+            labels={'x': 'Município', 'y': 'Número de Casos'},
+            color=top_municipios.values,
+            color_continuous_scale='Viridis'
         )
         
-        fig_faixa.update_layout(
+        fig_top.update_layout(
             xaxis_tickangle=-45,
             height=400
         )
-        
-        st.plotly_chart(fig_faixa, use_container_width=True)
+        return fig_top
     
-    col3, col4 = st.columns(2)
+    grafico('top', construir_fig_top)
+
+# SEÇÃO 2: DEMOGRAFIA
+elif secao == "👥 Demografia":
+    dados = agregar_secao('demografia')
+    st.header("Distribuição Demográfica dos Casos")
     
-    with col3:
-        # Distribuição por raça/cor
-        st.subheader("🎨 Distribuição por Raça/Cor")
-        raca_counts = df_filtrado['raca_cor'].value_counts().head(10)
-        
-        fig_raca = px.bar(
-            x=raca_counts.index,
-            y=raca_counts.values,
-            labels={'x': 'Raça/Cor', 'y': 'Número de Casos'},
-            color=raca_counts.values,
-            color_continuous_scale='Greens'
-        )
+    if dados is None:
+        st.info("Dados demográficos não estão disponíveis nas views do banco. Use o modo CSV para esta seção.")
+    else:
+        col1, col2 = st.columns(2)
         
-        fig_raca.update_layout(
-            xaxis_tickangle=-45,
-            height=400
-        )
+        with col1:
+            # Distribuição por sexo
+            st.subheader("📊 Distribuição por Sexo")
+            sexo_counts = dados['sexo_counts']
         
-        st.plotly_chart(fig_raca, use_container_width=True)
-    
-    with col4:
-        # Distribuição por ocupação
-        st.subheader("💼 Distribuição por Ocupação")
-        ocupacao_counts = df_filtrado['categoria_ocupacao'].value_counts()
+            def construir_fig_sexo():
+                fig_sexo = px.pie(
+                    values=sexo_counts.values,
+                    names=sexo_counts.index,
+                    hole=0.4,
+                    color_discrete_sequence=px.colors.qualitative.Set2
+                )
+                return fig_sexo
+            
+            grafico('sexo', construir_fig_sexo)
         
-        fig_ocupacao = px.pie(
-            values=ocupacao_counts.values,
-            names=ocupacao_counts.index,
-            hole=0.3,
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
+        with col2:
+            # Distribuição por faixa etária
+            st.subheader("👶👨👴 Distribuição por Faixa Etária")
+            faixa_counts = dados['faixa_counts']
         
-        st.plotly_chart(fig_ocupacao, use_container_width=True)
+            def construir_fig_faixa():
+                fig_faixa = px.bar(
+                    x=faixa_counts.index,
+                    y=faixa_counts.values,
+                    labels={'x': 'Faixa Etária', 'y': 'Número de Casos'},
+                    color=faixa_counts.values,
+                    color_continuous_scale='Blues'
+                )
+                
+                fig_faixa.update_layout(
+                    xaxis_tickangle=-45,
+                    height=400
+                )
+                return fig_faixa
+            
+            grafico('faixa', construir_fig_faixa)
+        
+        col3, col4 = st.columns(2)
+        
+        with col3:
+            # Distribuição por raça/cor
+            st.subheader("🎨 Distribuição por Raça/Cor")
+            raca_counts = dados['raca_counts']
+        
+            def construir_fig_raca():
+                fig_raca = px.bar(
+                    x=raca_counts.index,
+                    y=raca_counts.values,
+                    labels={'x': 'Raça/Cor', 'y': 'Número de Casos'},
+                    color=raca_counts.values,
+                    color_continuous_scale='Greens'
+                )
+                
+                fig_raca.update_layout(
+                    xaxis_tickangle=-45,
+                    height=400
+                )
+                return fig_raca
+            
+            grafico('raca', construir_fig_raca)
+        
+        with col4:
+            # Distribuição por ocupação
+            st.subheader("💼 Distribuição por Ocupação")
+            ocupacao_counts = dados['ocupacao_counts']
+        
+            def construir_fig_ocupacao():
+                fig_ocupacao = px.pie(
+                    values=ocupacao_counts.values,
+                    names=ocupacao_counts.index,
+                    hole=0.3,
+                    color_discrete_sequence=px.colors.qualitative.Pastel
+                )
+                return fig_ocupacao
+            
+            grafico('ocupacao', construir_fig_ocupacao)
 
-# TAB 3: VACINAÇÃO
-with tab3:
+# SEÇÃO 3: VACINAÇÃO
+elif secao == "💉 Vacinação":
+    dados = agregar_secao('vacinacao')
     st.header("Análise da Vacinação")
     
+    if 'aviso' in dados:
+        st.caption(dados['aviso'])
+    
     # Status vacinal
     st.subheader("Status Vacinal dos Casos")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        nao_vacinados = len(df_filtrado[df_filtrado['status_vacinal'] == 'Não Vacinado'])
+        nao_vacinados = dados['nao_vacinados']
         st.metric("Não Vacinados", nao_vacinados)
     
     with col2:
-        esquema_completo = len(df_filtrado[df_filtrado['status_vacinal'] == 'Esquema Completo'])
+        esquema_completo = dados['esquema_completo']
         st.metric("Esquema Completo", esquema_completo)
     
     with col3:
-        parcial = len(df_filtrado[df_filtrado['status_vacinal'] == 'Parcial'])
+        parcial = dados['parcial']
         st.metric("Parcialmente Vacinados", parcial)
     
     # Gráfico de status vacinal vs confirmação
-    status_vacinal_data = df_filtrado.groupby(['status_vacinal', 'target_confirmado']).size().reset_index(name='count')
-    
-    fig_vacina = px.bar(
-        status_vacinal_data,
-        x='status_vacinal',
-        y='count',
-        color='target_confirmado',
-        barmode='group',
-        labels={
-            'status_vacinal': 'Status Vacinal',
-            'count': 'Número de Casos',
-            'target_confirmado': 'Confirmado'
-        },
-        color_discrete_map={0: 'blue', 1: 'red'}
-    )
-    
-    fig_vacina.update_layout(
-        height=400,
-        xaxis_title="Status Vacinal",
-        yaxis_title="Número de Casos"
-    )
-    
-    st.plotly_chart(fig_vacina, use_container_width=True)
-    
-    # Fabricantes de vacina
-    st.subheader("Fabricantes de Vacina")
-    
-    fabricantes_counts = df_filtrado['fabricantes_vacina'].value_counts().head(10)
+    status_vacinal_data = dados['status_vacinal_data']
+    
+    def construir_fig_vacina():
+        fig_vacina = px.bar(
+            status_vacinal_data,
+            x='status_vacinal',
+            y='count',
+            color='target_confirmado',
+            barmode='group',
+            labels={
+                'status_vacinal': 'Status Vacinal',
+                'count': 'Número de Casos',
+                'target_confirmado': 'Confirmado'
+            },
+            color_discrete_map={0: 'blue', 1: 'red'}
+        )
+        
+        fig_vacina.update_layout(
+            height=400,
+            xaxis_title="Status Vacinal",
+            yaxis_title="Número de Casos"
+        )
+        return fig_vacina
     
-    fig_fabricantes = px.bar(
-        x=fabricantes_counts.index,
-        y=fabricantes_counts.values,
-        labels={'x': 'Fabricante', 'y': 'Número de Casos'},
-        color=fabricantes_counts.values,
-        color_continuous_scale='Purples'
-    )
+    grafico('vacina', construir_fig_vacina)
     
-    fig_fabricantes.update_layout(
-        xaxis_tickangle=-45,
-        height=400
-    )
-    
-    st.plotly_chart(fig_fabricantes, use_container_width=True)
+    # Fabricantes de vacina (não disponível no modo banco)
+    if 'fabricantes_counts' in dados:
+        st.subheader("Fabricantes de Vacina")
+        
+        fabricantes_counts = dados['fabricantes_counts']
+        
+        def construir_fig_fabricantes():
+            fig_fabricantes = px.bar(
+                x=fabricantes_counts.index,
+                y=fabricantes_counts.values,
+                labels={'x': 'Fabricante', 'y': 'Número de Casos'},
+                color=fabricantes_counts.values,
+                color_continuous_scale='Purples'
+            )
+            
+            fig_fabricantes.update_layout(
+                xaxis_tickangle=-45,
+                height=400
+            )
+            return fig_fabricantes
+        
+        grafico('fabricantes', construir_fig_fabricantes)
     
     # Taxa de confirmação por status vacinal
     st.subheader("Taxa de Confirmação por Status Vacinal")
     
-    taxa_vacina = df_filtrado.groupby('status_vacinal').agg({
-        'target_confirmado': ['count', 'sum']
-    }).round(2)
-    
-    taxa_vacina.columns = ['total', 'confirmados']
-    taxa_vacina['taxa'] = (taxa_vacina['confirmados'] / taxa_vacina['total'] * 100).round(1)
-    taxa_vacina = taxa_vacina.reset_index()
-    
-    fig_taxa_vacina = px.bar(
-        taxa_vacina,
-        x='status_vacinal',
-        y='taxa',
-        text='taxa',
-        labels={'status_vacinal': 'Status Vacinal', 'taxa': 'Taxa de Confirmação (%)'},
-        color='taxa',
-        color_continuous_scale='RdYlGn_r'
-    )
-    
-    fig_taxa_vacina.update_traces(texttemplate='%{text}%', textposition='outside')
-    fig_taxa_vacina.update_layout(height=400)
+    taxa_vacina = dados['taxa_vacina']
+    
+    def construir_fig_taxa_vacina():
+        fig_taxa_vacina = px.bar(
+            taxa_vacina,
+            x='status_vacinal',
+            y='taxa',
+            text='taxa',
+            labels={'status_vacinal': 'Status Vacinal', 'taxa': 'Taxa de Confirmação (%)'},
+            color='taxa',
+            color_continuous_scale='RdYlGn_r'
+        )
+        
+        fig_taxa_vacina.update_traces(texttemplate='%{text}%', textposition='outside')
+        fig_taxa_vacina.update_layout(height=400)
+        return fig_taxa_vacina
     
-    st.plotly_chart(fig_taxa_vacina, use_container_width=True)
+    grafico('taxa_vacina', construir_fig_taxa_vacina)
 
-# TAB 4: TESTES
-with tab4:
+# SEÇÃO 4: TESTES
+elif secao == "🧪 Testes":
+    dados = agregar_secao('testes')
     st.header("Análise de Testes")
     
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        total_testes = df_filtrado['testes_realizados'].sum()
-        st.metric("Total de Testes Realizados", total_testes)
-    
-    with col2:
-        positivos = len(df_filtrado[df_filtrado['resultado_teste_agregado'] == 'Positivo'])
-        st.metric("Testes Positivos", positivos)
-    
-    with col3:
-        taxa_positividade = (positivos / total_testes * 100) if total_testes > 0 else 0
-        st.metric("Taxa de Positividade", f"{taxa_positividade:.1f}%")
-    
-    # Tipos de teste
-    st.subheader("Tipos de Teste Realizados")
-    
-    # Processar tipos de teste (a coluna contém listas separadas por vírgula)
-    tipos_testes = []
-    for lista in df_filtrado['tipos_testes_lista'].dropna():
-        if ';' in str(lista):
-            tipos_testes.extend([t.strip() for t in str(lista).split(';')])
-        else:
-            tipos_testes.append(str(lista).strip())
-    
-    tipos_counts = pd.Series(tipos_testes).value_counts().head(10)
-    
-    fig_testes = px.bar(
-        x=tipos_counts.index,
-        y=tipos_counts.values,
-        labels={'x': 'Tipo de Teste', 'y': 'Quantidade'},
-        color=tipos_counts.values,
-        color_continuous_scale='Oranges'
-    )
-    
-    fig_testes.update_layout(
-        xaxis_tickangle=-45,
-        height=400
-    )
-    
-    st.plotly_chart(fig_testes, use_container_width=True)
-    
-    # Fabricantes de teste
-    st.subheader("Fabricantes de Teste")
-    
-    fabricantes_teste = []
-    for lista in df_filtrado['fabricantes_teste_lista'].dropna():
-        if ';' in str(lista):
-            fabricantes_teste.extend([t.strip() for t in str(lista).split(';')])
+    if 'indicadores' in dados:
+        # Modo banco: indicadores pré-calculados (indicadores_regionais)
+        st.caption(dados['aviso'])
+        indicadores = dados['indicadores']
+        
+        if indicadores.empty:
+            st.info("Nenhum indicador calculado para o filtro. Execute fx_calcular_taxa_positividade para o período.")
         else:
-            fabricantes_teste.append(str(lista).strip())
-    
-    fabricantes_counts = pd.Series(fabricantes_teste).value_counts().head(10)
-    
-    fig_fab_testes = px.bar(
-        x=fabricantes_counts.index,
-        y=fabricantes_counts.values,
-        labels={'x': 'Fabricante do Teste', 'y': 'Quantidade'},
-        color=fabricantes_counts.values,
-        color_continuous_scale='Bluered'
-    )
-    
-    fig_fab_testes.update_layout(
-        xaxis_tickangle=-45,
-        height=400
-    )
-    
-    st.plotly_chart(fig_fab_testes, use_container_width=True)
-    
-    # Resultados dos testes
-    st.subheader("Distribuição dos Resultados dos Testes")
-    
-    resultados_counts = df_filtrado['resultado_teste_agregado'].value_counts()
-    
-    fig_resultados = px.pie(
-        values=resultados_counts.values,
-        names=resultados_counts.index,
-        hole=0.3,
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    
-    st.plotly_chart(fig_resultados, use_container_width=True)
+            def construir_fig_indicadores():
+                fig_indicadores = px.bar(
+                    indicadores,
+                    x='municipio',
+                    y='taxa_positividade',
+                    color='periodo_inicio',
+                    barmode='group',
+                    labels={'municipio': 'Município', 'taxa_positividade': 'Taxa de Positividade (%)', 'periodo_inicio': 'Período'}
+                )
+                fig_indicadores.update_layout(xaxis_tickangle=-45, height=400)
+                return fig_indicadores
+            
+            grafico('indicadores', construir_fig_indicadores)
+            st.dataframe(indicadores, use_container_width=True)
+    else:
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            total_testes = dados['total_testes']
+            st.metric("Total de Testes Realizados", total_testes)
+        
+        with col2:
+            positivos = dados['positivos']
+            st.metric("Testes Positivos", positivos)
+        
+        with col3:
+            taxa_positividade = dados['taxa_positividade']
+            st.metric("Taxa de Positividade", f"{taxa_positividade:.1f}%")
+        
+        # Tipos de teste
+        st.subheader("Tipos de Teste Realizados")
+        
+        tipos_counts = dados['tipos_counts']
+        
+        def construir_fig_testes():
+            fig_testes = px.bar(
+                x=tipos_counts.index,
+                y=tipos_counts.values,
+                labels={'x': 'Tipo de Teste', 'y': 'Quantidade'},
+                color=tipos_counts.values,
+                color_continuous_scale='Oranges'
+            )
+            
+            fig_testes.update_layout(
+                xaxis_tickangle=-45,
+                height=400
+            )
+            return fig_testes
+        
+        grafico('testes', construir_fig_testes)
+        
+        # Fabricantes de teste
+        st.subheader("Fabricantes de Teste")
+        
+        fabricantes_counts = dados['fabricantes_counts']
+        
+        def construir_fig_fab_testes():
+            fig_fab_testes = px.bar(
+                x=fabricantes_counts.index,
+                y=fabricantes_counts.values,
+                labels={'x': 'Fabricante do Teste', 'y': 'Quantidade'},
+                color=fabricantes_counts.values,
+                color_continuous_scale='Bluered'
+            )
+            
+            fig_fab_testes.update_layout(
+                xaxis_tickangle=-45,
+                height=400
+            )
+            return fig_fab_testes
+        
+        grafico('fab_testes', construir_fig_fab_testes)
+        
+        # Resultados dos testes
+        st.subheader("Distribuição dos Resultados dos Testes")
+        
+        resultados_counts = dados['resultados_counts']
+        
+        def construir_fig_resultados():
+            fig_resultados = px.pie(
+                values=resultados_counts.values,
+                names=resultados_counts.index,
+                hole=0.3,
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+            return fig_resultados
+        
+        grafico('resultados', construir_fig_resultados)
 
-# TAB 5: MAPA
-with tab5:
+# SEÇÃO 5: MAPA
+elif secao == "🗺️ Mapa":
+    dados = agregar_secao('mapa')
     st.header("Mapa de Calor - Densidade de Notificações")
     
     # Criar coordenadas aproximadas para municípios (em um cenário real, teríamos lat/long)
     st.warning("🚧 Em desenvolvimento: Em um cenário real, este mapa mostraria a densidade de casos por região com coordenadas geográficas reais.")
     
-    # Simulação de dados geográficos para demonstração
-    municipio_casos = df_filtrado['municipio_nome'].value_counts().reset_index()
-    municipio_casos.columns = ['municipio', 'casos']
-    
-    # Ordenar por número de casos
-    municipio_casos = municipio_casos.sort_values('casos', ascending=False).head(20)
-    
-    fig_mapa_calor = px.bar(
-        municipio_casos,
-        x='municipio',
-        y='casos',
-        title='Top 20 Municípios por Número de Casos',
-        labels={'municipio': 'Município', 'casos': 'Número de Casos'},
-        color='casos',
-        color_continuous_scale='Hot'
-    )
-    
-    fig_mapa_calor.update_layout(
-        xaxis_tickangle=-45,
-        height=500
-    )
+    # Simulação de dados geográficos para demonstração (ordenado por número de casos)
+    municipio_casos = dados['municipio_casos']
+    
+    def construir_fig_mapa_calor():
+        fig_mapa_calor = px.bar(
+            municipio_casos,
+            x='municipio',
+            y='casos',
+            title='Top 20 Municípios por Número de Casos',
+            labels={'municipio': 'Município', 'casos': 'Número de Casos'},
+            color='casos',
+            color_continuous_scale='Hot'
+        )
+        
+        fig_mapa_calor.update_layout(
+            xaxis_tickangle=-45,
+            height=500
+        )
+        return fig_mapa_calor
     
-    st.plotly_chart(fig_mapa_calor, use_container_width=True)
+    grafico('mapa_calor', construir_fig_mapa_calor)
     
     # Gráfico de dispersão sintomas vs confirmação
-    st.subheader("Relação entre Sintomas e Confirmação")
-    
-    sintomas_data = pd.DataFrame({
-        'febre': df_filtrado['flg_febre'],
-        'tosse': df_filtrado['flg_tosse'],
-        'dispneia': df_filtrado['flg_dispneia'],
-        'confirmado': df_filtrado['target_confirmado']
-    })
-    
-    # Calcular correlação
-    corr_matrix = sintomas_data.corr()
-    
-    fig_corr = px.imshow(
-        corr_matrix,
-        text_auto=True,
-        aspect="auto",
-        color_continuous_scale='RdBu',
-        title='Correlação entre Sintomas e Confirmação'
-    )
+    if 'corr_matrix' in dados:
+        st.subheader("Relação entre Sintomas e Confirmação")
+        
+        # Correlação calculada em agregacoes.mapa / backend_duckdb.mapa (mesmos sintomas nos dois)
+        corr_matrix = dados['corr_matrix']
+        if dados.get('total_sintomas', 0) > MAX_SINTOMAS:
+            st.caption(f"Mostrando os {MAX_SINTOMAS} sintomas mais frequentes do dataset "
+                       f"(de {dados['total_sintomas']} distintos); os demais ficam fora do heatmap.")
+        
+        def construir_fig_corr():
+            fig_corr = px.imshow(
+                corr_matrix,
+                text_auto='.2f',
+                aspect="auto",
+                color_continuous_scale='RdBu',
+                zmin=-1,
+                zmax=1,
+                title='Correlação entre Sintomas e Confirmação'
+            )
+            fig_corr.update_layout(height=max(400, 32 * len(corr_matrix) + 150))
+            return fig_corr
+        
+        grafico('corr', construir_fig_corr)
     
-    st.plotly_chart(fig_corr, use_container_width=True)
+    # Modo banco: sintomas mais frequentes (vw_sintomas_frequentes, estado inteiro)
+    if 'sintomas_frequentes' in dados:
+        st.subheader("Sintomas Mais Frequentes")
+        
+        def construir_fig_sintomas():
+            fig_sintomas = px.bar(
+                dados['sintomas_frequentes'],
+                x='sintoma',
+                y=['frequencia_total', 'frequencia_em_confirmados'],
+                barmode='group',
+                labels={'sintoma': 'Sintoma', 'value': 'Frequência', 'variable': ''}
+            )
+            fig_sintomas.update_layout(xaxis_tickangle=-45, height=400)
+            return fig_sintomas
+        
+        grafico('sintomas', construir_fig_sintomas)
 
-# TAB 6: MODELO PREDITIVO
-with tab6:
+# SEÇÃO 6: MODELO PREDITIVO
+elif secao == "📊 Modelo Preditivo":
+    modelo = carregar_modelo()
     st.header("Modelo Preditivo - Probabilidade de Confirmação")
     
-    st.info("""
-    🔮 **Modelo Estatístico Simulado**
-    
-    Este modelo estima a probabilidade de um caso ser confirmado com base em:
-    - Sintomas apresentados
-    - Status vacinal
-    - Características demográficas
-    - Resultados de testes
-    """)
+    if modelo is None:
+        st.info("""
+        🔮 **Modelo Estatístico Simulado**
+        
+        Este modelo estima a probabilidade de um caso ser confirmado com base em:
+        - Sintomas apresentados
+        - Status vacinal
+        - Características demográficas
+        - Resultados de testes
+        """)
+        st.caption(f"Treine o modelo com `python modelo_confirmacao.py` (gera {modelo_confirmacao.ARQUIVO_MODELO}) para substituir os ajustes fixos.")
+    else:
+        metricas = modelo.metricas
+        st.info(f"""
+        🔮 **Regressão Logística Treinada**
+        
+        Ajustada em {metricas['linhas_treino']:,} notificações com desfecho conhecido
+        (AUC no holdout: {metricas['auc_teste']:.3f}), com base em:
+        - Sintomas apresentados (febre, tosse, dispneia)
+        - Status vacinal
+        - Idade e ocupação (profissional de saúde)
+        """)
     
     # Interface para simulação de previsão
     st.subheader("Simulador de Probabilidade")
@@ -528,36 +732,40 @@ with tab6:
     
     # Botão para calcular
     if st.button("Calcular Probabilidade de Confirmação", type="primary"):
-        # Simulação de modelo preditivo (em um cenário real, seria um modelo ML treinado)
-        
-        # Fatores de risco simulados
-        probabilidade_base = 0.3  # 30% base
-        
-        # Ajustes por fatores
-        ajustes = 0
-        
-        if idade >= 60:
-            ajustes += 0.15
-        elif idade >= 40:
-            ajustes += 0.08
-        
-        if febre:
-            ajustes += 0.20
-        if tosse:
-            ajustes += 0.15
-        if dispneia:
-            ajustes += 0.25
-        
-        if status_vacinal == "Esquema Completo":
-            ajustes -= 0.20
-        elif status_vacinal == "Parcial":
-            ajustes -= 0.10
-        
-        if profissional_saude:
-            ajustes += 0.05
+        if modelo is not None:
+            probabilidade_final = modelo.probabilidade(idade, status_vacinal, febre, tosse, dispneia, profissional_saude)
+        else:
+            # Sem modelo treinado: ajustes fixos simulados
+            
+            # Fatores de risco simulados
+            probabilidade_base = 0.3  # 30% base
+            
+            # Ajustes por fatores
+            ajustes = 0
+            
+            if idade >= 60:
+                ajustes += 0.15
+            elif idade >= 40:
+                ajustes += 0.08
+            
+            if febre:
+                ajustes += 0.20
+            if tosse:
+                ajustes += 0.15
+            if dispneia:
+                ajustes += 0.25
+            
+            if status_vacinal == "Esquema Completo":
+                ajustes -= 0.20
+            elif status_vacinal == "Parcial":
+                ajustes -= 0.10
+            
+            if profissional_saude:
+                ajustes += 0.05
+            
+            # Calcular probabilidade final
+            probabilidade_final = min(max(probabilidade_base + ajustes, 0), 0.95)
         
-        # Calcular probabilidade final
-        probabilidade_final = min(max(probabilidade_base + ajustes, 0), 0.95)
         probabilidade_percent = probabilidade_final * 100
         
         # Mostrar resultado
@@ -577,13 +785,55 @@ with tab6:
     # Análise de importância dos fatores
     st.subheader("Importância dos Fatores no Modelo")
     
-    fatores = pd.DataFrame({
-        'Fator': ['Dispneia', 'Febre', 'Idade ≥ 60', 'Tosse', 'Não Vacinado', 'Esquema Vacinal Completo', 'Profissional Saúde'],
-        'Impacto': ['+25%', '+20%', '+15%', '+15%', '+0%', '-20%', '+5%'],
-        'Direção': ['Aumenta risco', 'Aumenta risco', 'Aumenta risco', 'Aumenta risco', 'Neutro', 'Reduz risco', 'Aumenta risco']
-    })
+    if modelo is not None:
+        fatores = modelo.importancia()
+    else:
+        fatores = pd.DataFrame({
+            'Fator': ['Dispneia', 'Febre', 'Idade ≥ 60', 'Tosse', 'Não Vacinado', 'Esquema Vacinal Completo', 'Profissional Saúde'],
+            'Impacto': ['+25%', '+20%', '+15%', '+15%', '+0%', '-20%', '+5%'],
+            'Direção': ['Aumenta risco', 'Aumenta risco', 'Aumenta risco', 'Aumenta risco', 'Neutro', 'Reduz risco', 'Aumenta risco']
+        })
     
     st.dataframe(fatores, use_container_width=True)
+    
+    # Distribuição de risco das notificações filtradas (pontuadas em lote pelo modelo)
+    if modelo is not None:
+        st.subheader("Distribuição de Risco das Notificações Filtradas")
+        
+        with perfil.etapa("distribuição de risco") as etapa:
+            risco = distribuicao_risco(filtro, versao_dados, motor)
+            etapa['linhas'] = risco['total'] if risco else None
+        
+        if risco is None:
+            st.info("No modo banco as views não têm os atributos de cada notificação. Use o modo CSV ou DuckDB para esta análise.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("Notificações Pontuadas", f"{risco['total']:,}")
+            
+            with col2:
+                st.metric("Risco Médio", f"{risco['media'] * 100:.1f}%")
+            
+            with col3:
+                st.metric("Alta Probabilidade (≥ 60%)", f"{risco['alto_risco']:,}")
+            
+            def construir_fig_risco():
+                fig_risco = px.bar(
+                    risco['faixas'],
+                    x='risco',
+                    y='casos',
+                    labels={'risco': 'Probabilidade Estimada (%)', 'casos': 'Número de Notificações'},
+                    color='risco',
+                    color_continuous_scale='RdYlGn_r'
+                )
+                
+                fig_risco.update_layout(height=400, bargap=0.05)
+                return fig_risco
+            
+            grafico('risco', construir_fig_risco)
+
+perfil.marcar("rodapé")
 
 # Rodapé
 st.markdown("---")
@@ -595,4 +845,45 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Painel de perfilamento (só com ?perfil=1 na URL ou DASHBOARD_PERFIL=1)
+if perfil.ativo:
+    perfil.encerrar()
+    perfil.contexto.update(
+        secao=secao,
+        municipios=list(filtro.municipios),
+        inicio=str(filtro.inicio),
+        fim=str(filtro.fim),
+        versao_dados=versao_dados
+    )
+    
+    with st.sidebar.expander(f"⏱️ Perfil do rerun: {perfil.total_ms:.0f} ms", expanded=True):
+        st.dataframe(perfil.tabela(), use_container_width=True, hide_index=True)
+        
+        # Resumo em chama: cada etapa dentro da etapa que a contém (tempo próprio = sem as internas)
+        etapas = perfil.etapas
+        filhos = {}
+        for e in etapas:
+            if e['pai'] is not None:
+                filhos[e['pai']] = filhos.get(e['pai'], 0) + e['ms']
+        
+        fig_perfil = go.Figure(go.Icicle(
+            ids=[str(e['id']) for e in etapas],
+            labels=[e['nome'] for e in etapas],
+            parents=['' if e['pai'] is None else str(e['pai']) for e in etapas],
+            values=[max(e['ms'] - filhos.get(e['id'], 0), 0) for e in etapas],
+            branchvalues='remainder',
+            tiling=dict(orientation='v'),
+            hovertemplate='%{label}<br>%{value:.1f} ms próprios<extra></extra>'
+        ))
+        fig_perfil.update_layout(height=300, margin=dict(t=10, l=0, r=0, b=0))
+        
+        st.plotly_chart(fig_perfil, use_container_width=True)
+        
+        st.download_button(
+            "Exportar perfil (JSON)",
+            data=json.dumps(perfil.relatorio(), ensure_ascii=False, indent=2),
+            file_name=f"perfil_{datetime.now():%Y%m%d_%H%M%S}.json",
+            mime="application/json"
+        )
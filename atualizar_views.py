@@ -0,0 +1,151 @@
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# ==============================================================================
+# ATUALIZAÇÃO DAS VIEWS MATERIALIZADAS (views_materializadas.sql)
+# ==============================================================================
+# Executado automaticamente ao final do insercao.py, ou manualmente:
+#   python atualizar_views.py
+#   python atualizar_views.py --verificar-rollup     (confere casos_diarios)
+#   python atualizar_views.py --reconstruir-rollup   (recalcula casos_diarios do zero)
+#
+# Cargas em massa (insercao.py, benchmark_sql.py) rodam dentro de
+# carga_sem_rollup: o trigger do rollup fica desligado e casos_diarios é
+# reconstruída uma vez no final.
+
+VIEWS_MATERIALIZADAS = [
+    'mvw_casos_por_municipio',
+    'mvw_vacinacao_por_resultado',
+    'mvw_sintomas_frequentes',
+]
+
+
+def atualizar_views_materializadas(engine):
+    """Atualiza cada view materializada e retorna {view: segundos}.
+
+    Usa REFRESH ... CONCURRENTLY (leitores não são bloqueados). Se a view
+    ainda não foi populada, o Postgres não aceita CONCURRENTLY, então fazemos
+    o refresh comum nesse caso.
+    """
+    duracoes = {}
+    # AUTOCOMMIT: cada refresh confirma sozinho e libera a view assim que termina
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        populadas = dict(conn.execute(text(
+            "SELECT matviewname, ispopulated FROM pg_matviews WHERE matviewname = ANY(:nomes)"
+        ), {'nomes': VIEWS_MATERIALIZADAS}).fetchall())
+
+        for view in VIEWS_MATERIALIZADAS:
+            if view not in populadas:
+                print(f"   [AVISO] {view} não existe. Execute views_materializadas.sql antes.")
+                continue
+
+            modo = "CONCURRENTLY " if populadas[view] else ""
+            inicio = time.perf_counter()
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW {modo}{view}"))
+            duracoes[view] = time.perf_counter() - inicio
+            print(f"   -> {view}: {duracoes[view]:.2f}s")
+
+    return duracoes
+
+
+def verificar_casos_diarios(engine):
+    """Compara o rollup casos_diarios com o recálculo completo.
+
+    Retorna a lista de células divergentes (vazia = consistente).
+    """
+    with engine.connect() as conn:
+        divergencias = conn.execute(text("SELECT * FROM fx_verificar_casos_diarios()")).mappings().all()
+
+    if divergencias:
+        print(f"   [ALERTA] casos_diarios diverge do recálculo em {len(divergencias)} célula(s):")
+        for d in divergencias[:20]:
+            print(f"      {d['municipio_ibge']} {d['data_notificacao']}: "
+                  f"total {d['total_rollup']} x {d['total_recalculo']}, "
+                  f"confirmados {d['confirmados_rollup']} x {d['confirmados_recalculo']}, "
+                  f"descartados {d['descartados_rollup']} x {d['descartados_recalculo']}, "
+                  f"óbitos {d['obitos_rollup']} x {d['obitos_recalculo']}")
+    else:
+        print("   -> casos_diarios consistente com o recálculo completo.")
+
+    return divergencias
+
+
+def reconstruir_casos_diarios(engine):
+    """Recalcula o rollup casos_diarios a partir de notificacao x dados_clinicos."""
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT fx_reconstruir_casos_diarios()"))
+    print(f"   -> casos_diarios reconstruída em {time.perf_counter() - inicio:.2f}s")
+
+
+@contextmanager
+def carga_sem_rollup(engine):
+    """Desliga o trigger do rollup durante uma carga em massa e reconstrói casos_diarios no fim.
+
+    Linha a linha, o trigger faz um UPSERT em casos_diarios para cada dados_clinicos
+    inserido; numa carga grande sai bem mais barato recalcular tudo de uma vez.
+    Sem casos_diarios.sql instalado, não faz nada.
+    """
+    with engine.begin() as conn:
+        instalado = conn.execute(text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'trg_casos_diarios_clinicos'"
+        )).first() is not None
+        if instalado:
+            conn.execute(text("ALTER TABLE dados_clinicos DISABLE TRIGGER trg_casos_diarios_clinicos"))
+
+    try:
+        yield
+    finally:
+        if instalado:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE dados_clinicos ENABLE TRIGGER trg_casos_diarios_clinicos"))
+
+    if instalado:
+        reconstruir_casos_diarios(engine)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Atualiza as views materializadas do Dashboard.")
+    parser.add_argument('--verificar-rollup', action='store_true',
+                        help="Compara casos_diarios com o recálculo completo (sai com código 1 se divergir)")
+    parser.add_argument('--reconstruir-rollup', action='store_true',
+                        help="Recalcula casos_diarios do zero")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    DB_CONFIG = {
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASS'),
+        'host': os.getenv('DB_HOST'),
+        'port': '5432',
+        'dbname': os.getenv('DB_NAME')
+    }
+
+    CONN_STR = f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
+
+    try:
+        engine = create_engine(CONN_STR)
+
+        if args.reconstruir_rollup:
+            print(">> Reconstruindo rollup diário...")
+            reconstruir_casos_diarios(engine)
+
+        if args.verificar_rollup:
+            print(">> Verificando rollup diário...")
+            if verificar_casos_diarios(engine):
+                sys.exit(1)
+
+        if not (args.verificar_rollup or args.reconstruir_rollup):
+            print(">> Atualizando views materializadas...")
+            duracoes = atualizar_views_materializadas(engine)
+            print(f">> Concluído em {sum(duracoes.values()):.2f}s")
+    except Exception as e:
+        print(f"\n[ERRO] Falha ao atualizar as views materializadas.")
+        print(f"Detalhe: {e}")
+        sys.exit(1)
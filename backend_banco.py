@@ -0,0 +1,320 @@
+import os
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+from dotenv import load_dotenv
+
+from motor_filtros import Filtro
+
+# ==============================================================================
+# MODO BANCO (AO VIVO) PARA O DASHBOARD
+# ==============================================================================
+# Ativado com DASHBOARD_BACKEND=banco. Em vez do CSV exportado pelo limpeza.py,
+# as métricas vêm direto das views analíticas (views.sql / views_materializadas.sql),
+# do rollup diário casos_diarios (séries por município e mês, via vw_casos_diarios)
+# e da tabela indicadores_regionais, então o Dashboard reflete a última carga.
+#
+#   * Um único engine SQLAlchemy com pool de conexões por processo, compartilhado
+#     por todas as sessões do Streamlit.
+#   * Cache de resultados com TTL por processo, chaveado pela query e pelos
+#     parâmetros do filtro. Sessões simultâneas com o mesmo filtro disparam UMA
+#     consulta: as demais esperam o resultado da primeira.
+#
+# Nem tudo do CSV existe nas views: Demografia não tem fonte no banco, e as
+# views de vacinação e sintomas não têm município/data (são totais gerais).
+
+load_dotenv()
+
+DB_CONFIG = {
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASS'),
+    'host': os.getenv('DB_HOST'),
+    'port': '5432',
+    'dbname': os.getenv('DB_NAME')
+}
+
+CONN_STR = f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
+
+TTL_PADRAO = int(os.getenv('DASHBOARD_CACHE_TTL', '300'))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def obter_engine():
+    """Engine com pool, criado uma única vez por processo."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                CONN_STR,
+                pool_size=int(os.getenv('DASHBOARD_POOL_SIZE', '5')),
+                max_overflow=int(os.getenv('DASHBOARD_POOL_OVERFLOW', '5')),
+                pool_pre_ping=True,   # descarta conexões derrubadas pelo servidor
+                pool_recycle=1800,
+            )
+        return _engine
+
+
+class _EmAndamento:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class CacheTTL:
+    """Cache de resultados com expiração; consultas iguais e simultâneas rodam uma vez só."""
+
+    def __init__(self, ttl=TTL_PADRAO):
+        self.ttl = ttl
+        self._itens = {}
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > time.monotonic():
+                return item[1]
+
+            andamento = self._em_andamento.get(chave)
+            dono = andamento is None
+            if dono:
+                andamento = self._em_andamento[chave] = _EmAndamento()
+
+        if not dono:
+            andamento.pronto.wait()
+            if andamento.erro is not None:
+                raise andamento.erro
+            return andamento.valor
+
+        try:
+            andamento.valor = calcular()
+            with self._lock:
+                self._itens[chave] = (time.monotonic() + self.ttl, andamento.valor)
+                # Limpa expirados para o cache não crescer indefinidamente
+                agora = time.monotonic()
+                for k in [k for k, (expira, _) in self._itens.items() if expira <= agora]:
+                    del self._itens[k]
+        except Exception as e:
+            andamento.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            andamento.pronto.set()
+        return andamento.valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+# Cache único do processo (compartilhado entre sessões e instâncias do backend)
+_cache = CacheTTL()
+
+
+def _confirmado(coluna):
+    return f"({coluna} ILIKE '%Confirmado%' OR {coluna} ILIKE '%Laboratorial%')"
+
+
+class BackendBanco:
+    def __init__(self, engine=None, cache=None):
+        self.engine = engine or obter_engine()
+        self.cache = cache or _cache
+
+        # Views materializadas (views_materializadas.sql), se existirem, são bem mais baratas
+        materializadas = set(self.df("SELECT matviewname FROM pg_matviews")['matviewname'])
+        # Séries por município/dia: o rollup casos_diarios (casos_diarios.sql), mantido
+        # pelos triggers, é lido direto e está sempre atualizado; sem ele, a view
+        # materializada e, por último, a view que reagrega as notificações
+        rollup = not self.df("SELECT viewname FROM pg_views WHERE viewname = 'vw_casos_diarios'").empty
+        if rollup:
+            self.view_casos = 'vw_casos_diarios'
+        elif 'mvw_casos_por_municipio' in materializadas:
+            self.view_casos = 'mvw_casos_por_municipio'
+        else:
+            self.view_casos = 'vw_casos_por_municipio'
+        self.view_vacinacao = 'mvw_vacinacao_por_resultado' if 'mvw_vacinacao_por_resultado' in materializadas else 'vw_vacinacao_por_resultado'
+        self.view_sintomas = 'mvw_sintomas_frequentes' if 'mvw_sintomas_frequentes' in materializadas else 'vw_sintomas_frequentes'
+
+    def df(self, sql, parametros=None):
+        """Executa a query (ou devolve do cache TTL) e retorna um DataFrame.
+
+        Não modificar o resultado: o mesmo objeto é entregue a todas as sessões.
+        """
+        parametros = parametros or {}
+        chave = (sql, tuple(sorted(parametros.items())))
+
+        def consultar():
+            consulta = text(sql)
+            if 'municipios' in parametros:
+                consulta = consulta.bindparams(bindparam('municipios', expanding=True))
+            with self.engine.connect() as conn:
+                return pd.read_sql(consulta, conn, params=parametros)
+
+        return self.cache.obter(chave, consultar)
+
+    # --- mesma interface de filtros do MotorFiltros ---
+    # Municípios e datas passam pelo cache TTL (o backend fica em cache_resource
+    # por processo): uma nova carga aparece na sidebar quando o TTL vence.
+    @property
+    def municipios(self):
+        return list(self.df(
+            f"SELECT DISTINCT municipio FROM {self.view_casos} WHERE municipio IS NOT NULL ORDER BY 1"
+        )['municipio'])
+
+    def _datas(self):
+        datas = self.df(f"SELECT MIN(data_notificacao) AS min, MAX(data_notificacao) AS max FROM {self.view_casos}").iloc[0]
+        return tuple(None if pd.isna(d) else pd.Timestamp(d).date() for d in (datas['min'], datas['max']))
+
+    @property
+    def tem_datas(self):
+        return self.data_min is not None
+
+    @property
+    def data_min(self):
+        return self._datas()[0]
+
+    @property
+    def data_max(self):
+        return self._datas()[1]
+
+    def criar_filtro(self, municipios, inicio=None, fim=None):
+        return Filtro(tuple(sorted(municipios)), inicio, fim)
+
+    def where(self, filtro, coluna_data='data_notificacao', coluna_municipio='municipio'):
+        condicoes, parametros = [], {}
+        if filtro.inicio is not None and filtro.fim is not None:
+            condicoes.append(f"{coluna_data} BETWEEN :inicio AND :fim")
+            parametros.update(inicio=filtro.inicio, fim=filtro.fim)
+        if filtro.municipios:
+            condicoes.append(f"{coluna_municipio} IN :municipios")
+            parametros['municipios'] = filtro.municipios
+        return (f"WHERE {' AND '.join(condicoes)}" if condicoes else ""), parametros
+
+
+def visao_geral(backend, filtro):
+    where, parametros = backend.where(filtro)
+    df_mes = backend.df(f"""
+        SELECT TO_CHAR(DATE_TRUNC('month', data_notificacao), 'MM/YYYY') AS mes_ano,
+               SUM(total_notificacoes) AS total,
+               SUM(casos_confirmados) AS confirmados
+        FROM {backend.view_casos} {where}
+        GROUP BY DATE_TRUNC('month', data_notificacao) ORDER BY DATE_TRUNC('month', data_notificacao)
+    """, parametros)
+    df_mes = df_mes[df_mes['mes_ano'].notna()].copy()
+    df_mes['taxa_confirmacao'] = (df_mes['confirmados'] / df_mes['total'] * 100).fillna(0)
+
+    top = backend.df(f"""
+        SELECT municipio, SUM(total_notificacoes) AS casos
+        FROM {backend.view_casos} {where}
+        GROUP BY 1 ORDER BY 2 DESC LIMIT 10
+    """, parametros)
+
+    totais = backend.df(f"""
+        SELECT COALESCE(SUM(total_notificacoes), 0) AS total, COALESCE(SUM(casos_confirmados), 0) AS confirmados
+        FROM {backend.view_casos} {where}
+    """, parametros).iloc[0]
+
+    return {
+        'total_casos': int(totais['total']),
+        'confirmados': int(totais['confirmados']),
+        'casos_mes': df_mes[['mes_ano', 'total']],
+        'confirmados_mes': df_mes.loc[df_mes['confirmados'] > 0, ['mes_ano', 'confirmados']],
+        'df_mes': df_mes,
+        'top_municipios': pd.Series(top['casos'].to_numpy(), index=top['municipio'].to_numpy()),
+    }
+
+
+def vacinacao(backend, filtro):
+    # A view não tem município/data: os números são do estado inteiro
+    base = backend.df(f"""
+        SELECT CASE WHEN status_vacinal = 'Parcial (1 Dose)' THEN 'Parcial' ELSE status_vacinal END AS status_vacinal,
+               CASE WHEN classificacao = 'Em Análise' THEN NULL
+                    WHEN {_confirmado('classificacao')} THEN 1 ELSE 0 END AS target_confirmado,
+               SUM(total_pacientes) AS count
+        FROM {backend.view_vacinacao}
+        GROUP BY 1, 2 ORDER BY 1, 2
+    """)
+
+    status_counts = base.groupby('status_vacinal')['count'].sum()
+    status_vacinal_data = base.dropna(subset=['target_confirmado'])
+
+    taxa_vacina = (
+        status_vacinal_data
+        .assign(confirmados=status_vacinal_data['count'].where(status_vacinal_data['target_confirmado'] == 1, 0))
+        .groupby('status_vacinal')
+        .agg(total=('count', 'sum'), confirmados=('confirmados', 'sum'))
+        .reset_index()
+    )
+    taxa_vacina['taxa'] = (taxa_vacina['confirmados'] / taxa_vacina['total'] * 100).round(1)
+
+    return {
+        'aviso': "Modo banco: a view de vacinação não tem município/data, os números são do estado inteiro.",
+        'nao_vacinados': int(status_counts.get('Não Vacinado', 0)),
+        'esquema_completo': int(status_counts.get('Esquema Completo', 0)),
+        'parcial': int(status_counts.get('Parcial', 0)),
+        'status_vacinal_data': status_vacinal_data,
+        'taxa_vacina': taxa_vacina,
+    }
+
+
+def testes(backend, filtro):
+    # Indicadores pré-calculados por fx_calcular_taxa_positividade (calculos.sql),
+    # dos períodos que se sobrepõem ao filtro
+    condicoes, parametros = [], {}
+    if filtro.inicio is not None and filtro.fim is not None:
+        condicoes.append("ir.periodo_fim >= :inicio AND ir.periodo_inicio <= :fim")
+        parametros.update(inicio=filtro.inicio, fim=filtro.fim)
+    if filtro.municipios:
+        condicoes.append("m.nome IN :municipios")
+        parametros['municipios'] = filtro.municipios
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    indicadores = backend.df(f"""
+        SELECT m.nome AS municipio, ir.periodo_inicio, ir.periodo_fim,
+               ir.taxa_positividade, ir.tempo_medio_sintomas_teste,
+               ir.perc_prof_saude_infectados, ir.media_doses_vacina, ir.data_processamento
+        FROM indicadores_regionais ir
+        JOIN municipio m ON ir.municipio_ibge = m.municipio_ibge
+        {where}
+        ORDER BY ir.periodo_inicio DESC, ir.taxa_positividade DESC
+    """, parametros)
+
+    return {
+        'aviso': "Modo banco: indicadores de indicadores_regionais (atualize com fx_calcular_taxa_positividade).",
+        'indicadores': indicadores,
+    }
+
+
+def mapa(backend, filtro):
+    where, parametros = backend.where(filtro)
+    municipio_casos = backend.df(f"""
+        SELECT municipio, SUM(total_notificacoes) AS casos
+        FROM {backend.view_casos} {where}
+        GROUP BY 1 ORDER BY 2 DESC LIMIT 20
+    """, parametros)
+
+    sintomas = backend.df(f"""
+        SELECT sintoma, frequencia_total, frequencia_em_confirmados
+        FROM {backend.view_sintomas}
+        ORDER BY frequencia_em_confirmados DESC LIMIT 15
+    """)
+
+    return {
+        'municipio_casos': municipio_casos,
+        'sintomas_frequentes': sintomas,
+    }
+
+
+# Demografia não tem fonte nas views: a seção mostra um aviso no modo banco
+AGREGACOES = {
+    'visao_geral': visao_geral,
+    'vacinacao': vacinacao,
+    'testes': testes,
+    'mapa': mapa,
+}
@@ -0,0 +1,281 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from coocorrencia import correlacao_pares, sintomas_heatmap
+from indice_multivalor import COLUNAS_MULTIVALOR
+from motor_filtros import Filtro
+
+# ==============================================================================
+# BACKEND DUCKDB (OPCIONAL) PARA O DASHBOARD
+# ==============================================================================
+# Ativado com DASHBOARD_BACKEND=duckdb. Em vez de manter o CSV inteiro como
+# DataFrame em cada processo, o dataset é convertido uma vez para Parquet e
+# consultado por um DuckDB em memória: cada gráfico vira uma consulta SQL com
+# os filtros da sidebar no WHERE (empurrados para a leitura do Parquet) e só o
+# resultado agregado volta para o pandas/Plotly. O DuckDB paraleliza as
+# agregações em várias threads.
+#
+# As funções de AGREGACOES devolvem os mesmos dicionários de agregacoes.py.
+
+try:
+    import duckdb
+except ImportError:  # dependência opcional
+    duckdb = None
+
+
+def _caminho_parquet(caminho_csv):
+    return os.path.splitext(caminho_csv)[0] + '.parquet'
+
+
+class BackendDuckDB:
+    def __init__(self, caminho_csv, threads=None):
+        if duckdb is None:
+            raise ImportError("DASHBOARD_BACKEND=duckdb requer o pacote duckdb (pip install duckdb)")
+
+        self.caminho_parquet = _caminho_parquet(caminho_csv)
+        self._conn = duckdb.connect()
+        self._local = threading.local()
+        if threads:
+            self._conn.execute(f"SET threads = {int(threads)}")
+
+        # Converte o CSV só quando o Parquet não existe ou está desatualizado
+        if (not os.path.exists(self.caminho_parquet)
+                or os.path.getmtime(self.caminho_parquet) < os.path.getmtime(caminho_csv)):
+            self._converter_para_parquet(caminho_csv)
+
+        self._conn.execute(f"CREATE VIEW dataset AS SELECT * FROM read_parquet('{self.caminho_parquet}')")
+
+        self.municipios = [m for (m,) in self._consultar(
+            "SELECT DISTINCT municipio_nome FROM dataset WHERE municipio_nome IS NOT NULL ORDER BY 1"
+        ).fetchall()]
+        self._data_min, self._data_max = self._consultar(
+            "SELECT MIN(data_notificacao), MAX(data_notificacao) FROM dataset"
+        ).fetchone()
+        # Mesmos sintomas do heatmap do MotorFiltros (mais frequentes do dataset inteiro)
+        self.sintomas, self.total_sintomas = sintomas_heatmap(
+            self.contar_multivalor('sintomas_texto', self.criar_filtro([]))
+        )
+
+    def _converter_para_parquet(self, caminho_csv):
+        # Mesmas derivações do load_data do app.py, feitas uma vez na conversão.
+        # Colunas multivaloradas como VARCHAR: códigos '1' não podem virar 1.0.
+        tipos = ', '.join(f"'{c}': 'VARCHAR'" for c in COLUNAS_MULTIVALOR)
+        origem = f"read_csv('{caminho_csv}', delim = ';', header = true, types = {{{tipos}}})"
+
+        colunas = {c for (c, *_) in self._conn.execute(f"DESCRIBE SELECT * FROM {origem}").fetchall()}
+        datas = [c for c in ['data_notificacao', 'data_inicio_sintomas'] if c in colunas]
+        substituir = ', '.join(f"TRY_CAST({c} AS DATE) AS {c}" for c in datas)
+
+        temporario = self.caminho_parquet + '.tmp'
+        self._conn.execute(f"""
+            COPY (
+                SELECT * REPLACE ({substituir}),
+                strftime(TRY_CAST(data_notificacao AS DATE), '%Y-%m') AS ano_mes,
+                strftime(TRY_CAST(data_notificacao AS DATE), '%m/%Y') AS mes_ano
+                FROM {origem}
+                ORDER BY data_notificacao
+            ) TO '{temporario}' (FORMAT parquet)
+        """)
+        os.replace(temporario, self.caminho_parquet)
+
+    def _consultar(self, sql, parametros=None):
+        # Um cursor por thread: o Streamlit atende cada sessão em uma thread
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._conn.cursor()
+        return cursor.execute(sql, parametros or [])
+
+    # --- mesma interface de filtros do MotorFiltros ---
+    @property
+    def tem_datas(self):
+        return self._data_min is not None
+
+    @property
+    def data_min(self):
+        return self._data_min
+
+    @property
+    def data_max(self):
+        return self._data_max
+
+    def criar_filtro(self, municipios, inicio=None, fim=None):
+        return Filtro(tuple(sorted(municipios)), inicio, fim)
+
+    def where(self, filtro, extra=None):
+        """Cláusula WHERE (e parâmetros) equivalente ao filtro da sidebar."""
+        condicoes, parametros = [], []
+        if filtro.inicio is not None and filtro.fim is not None:
+            condicoes.append("data_notificacao BETWEEN ? AND ?")
+            parametros += [filtro.inicio, filtro.fim]
+        if filtro.municipios:
+            condicoes.append(f"municipio_nome IN ({', '.join('?' * len(filtro.municipios))})")
+            parametros += list(filtro.municipios)
+        if extra:
+            condicoes.append(extra)
+        return (f"WHERE {' AND '.join(condicoes)}" if condicoes else ""), parametros
+
+    def df(self, sql, parametros=None):
+        return self._consultar(sql, parametros).df()
+
+    def selecionar(self, filtro, colunas):
+        """Linhas filtradas, só com as colunas pedidas (ex.: atributos do modelo preditivo)."""
+        where, parametros = self.where(filtro)
+        return self.df(f"SELECT {', '.join(colunas)} FROM dataset {where}", parametros)
+
+    def contagem(self, coluna, filtro, top=None):
+        """Equivalente a df[coluna].value_counts() (ignora nulos, maior contagem primeiro)."""
+        where, parametros = self.where(filtro, f"{coluna} IS NOT NULL")
+        limite = f"LIMIT {int(top)}" if top else ""
+        resultado = self.df(f"""
+            SELECT {coluna} AS valor, COUNT(*) AS n FROM dataset {where}
+            GROUP BY 1 ORDER BY n DESC, valor {limite}
+        """, parametros)
+        return pd.Series(resultado['n'].to_numpy(), index=resultado['valor'].to_numpy(), name='count')
+
+    def contar_multivalor(self, coluna, filtro, top=None):
+        """Contagem dos valores de uma coluna multivalorada (mesmos separadores do índice CSR)."""
+        where, parametros = self.where(filtro, f"{coluna} IS NOT NULL")
+        limite = f"LIMIT {int(top)}" if top else ""
+        resultado = self.df(f"""
+            WITH valores AS (
+                SELECT trim(unnest(regexp_split_to_array({coluna}, '{COLUNAS_MULTIVALOR[coluna]}'))) AS valor
+                FROM dataset {where}
+            )
+            SELECT valor, COUNT(*) AS n FROM valores WHERE valor <> ''
+            GROUP BY 1 ORDER BY n DESC, valor {limite}
+        """, parametros)
+        return pd.Series(resultado['n'].to_numpy(), index=resultado['valor'].to_numpy(), name='count')
+
+
+def visao_geral(backend, filtro):
+    where, parametros = backend.where(filtro)
+    totais = backend.df(f"""
+        SELECT COUNT(*) AS total_casos, COALESCE(SUM(target_confirmado), 0) AS confirmados
+        FROM dataset {where}
+    """, parametros).iloc[0]
+
+    where_mes, parametros_mes = backend.where(filtro, "mes_ano IS NOT NULL")
+    df_mes = backend.df(f"""
+        SELECT mes_ano,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE target_confirmado = 1) AS confirmados
+        FROM dataset {where_mes}
+        GROUP BY ano_mes, mes_ano ORDER BY ano_mes
+    """, parametros_mes)
+    df_mes['taxa_confirmacao'] = (df_mes['confirmados'] / df_mes['total'] * 100).fillna(0)
+
+    return {
+        'total_casos': int(totais['total_casos']),
+        'confirmados': int(totais['confirmados']),
+        'casos_mes': df_mes[['mes_ano', 'total']],
+        'confirmados_mes': df_mes.loc[df_mes['confirmados'] > 0, ['mes_ano', 'confirmados']],
+        'df_mes': df_mes,
+        'top_municipios': backend.contagem('municipio_nome', filtro, top=10),
+    }
+
+
+def demografia(backend, filtro):
+    return {
+        'sexo_counts': backend.contagem('sexo', filtro),
+        'faixa_counts': backend.contagem('faixa_etaria', filtro),
+        'raca_counts': backend.contagem('raca_cor', filtro, top=10),
+        'ocupacao_counts': backend.contagem('categoria_ocupacao', filtro),
+    }
+
+
+def vacinacao(backend, filtro):
+    status_counts = backend.contagem('status_vacinal', filtro)
+
+    where, parametros = backend.where(filtro, "status_vacinal IS NOT NULL AND target_confirmado IS NOT NULL")
+    status_vacinal_data = backend.df(f"""
+        SELECT status_vacinal, target_confirmado, COUNT(*) AS count
+        FROM dataset {where}
+        GROUP BY 1, 2 ORDER BY 1, 2
+    """, parametros)
+
+    where, parametros = backend.where(filtro, "status_vacinal IS NOT NULL")
+    taxa_vacina = backend.df(f"""
+        SELECT status_vacinal,
+               COUNT(target_confirmado) AS total,
+               COALESCE(SUM(target_confirmado), 0) AS confirmados
+        FROM dataset {where}
+        GROUP BY 1 ORDER BY 1
+    """, parametros)
+    taxa_vacina['taxa'] = (taxa_vacina['confirmados'] / taxa_vacina['total'] * 100).round(1)
+
+    return {
+        'nao_vacinados': int(status_counts.get('Não Vacinado', 0)),
+        'esquema_completo': int(status_counts.get('Esquema Completo', 0)),
+        'parcial': int(status_counts.get('Parcial', 0)),
+        'status_vacinal_data': status_vacinal_data,
+        'fabricantes_counts': backend.contar_multivalor('fabricantes_vacina', filtro, top=10),
+        'taxa_vacina': taxa_vacina,
+    }
+
+
+def testes(backend, filtro):
+    where, parametros = backend.where(filtro)
+    totais = backend.df(f"""
+        SELECT COALESCE(SUM(testes_realizados), 0) AS total_testes,
+               COUNT(*) FILTER (WHERE resultado_teste_agregado = 'Positivo') AS positivos
+        FROM dataset {where}
+    """, parametros).iloc[0]
+    total_testes, positivos = int(totais['total_testes']), int(totais['positivos'])
+
+    return {
+        'total_testes': total_testes,
+        'positivos': positivos,
+        'taxa_positividade': (positivos / total_testes * 100) if total_testes > 0 else 0,
+        'tipos_counts': backend.contar_multivalor('tipos_testes_lista', filtro, top=10),
+        'fabricantes_counts': backend.contar_multivalor('fabricantes_teste_lista', filtro, top=10),
+        'resultados_counts': backend.contagem('resultado_teste_agregado', filtro),
+    }
+
+
+def mapa(backend, filtro):
+    municipio_casos = backend.contagem('municipio_nome', filtro, top=20).reset_index()
+    municipio_casos.columns = ['municipio', 'casos']
+
+    # Z'Z das colunas [sintomas..., confirmado, alvo válido, 1] somada no SQL; a
+    # correlação sai das mesmas contagens e da mesma fórmula do modo pandas (coocorrencia.py)
+    k = len(backend.sintomas)
+    colunas = [f"z{i}" for i in range(k + 2)] + ["true"]
+    i, j = np.triu_indices(k + 3)
+    where, parametros = backend.where(filtro)
+    somas = backend.df(f"""
+        WITH z AS (
+            SELECT {''.join(f"COALESCE(list_contains(sintomas, ?), false) AS z{s}, " for s in range(k))}
+                   COALESCE(target_confirmado = 1, false) AS z{k},
+                   target_confirmado IS NOT NULL AS z{k + 1}
+            FROM (
+                SELECT list_transform(regexp_split_to_array(sintomas_texto, '{COLUNAS_MULTIVALOR['sintomas_texto']}'),
+                                      x -> trim(x)) AS sintomas,
+                       target_confirmado
+                FROM dataset {where}
+            )
+        )
+        SELECT {', '.join(f"COUNT(*) FILTER (WHERE {colunas[a]} AND {colunas[b]})" for a, b in zip(i, j))}
+        FROM z
+    """, backend.sintomas + parametros).iloc[0].to_numpy()
+
+    m = np.zeros((k + 3, k + 3), dtype=np.int64)
+    m[i, j] = somas
+    m = m + np.triu(m, 1).T
+
+    return {
+        'municipio_casos': municipio_casos,
+        'corr_matrix': correlacao_pares(m, backend.sintomas),
+        'total_sintomas': backend.total_sintomas,
+    }
+
+
+AGREGACOES = {
+    'visao_geral': visao_geral,
+    'demografia': demografia,
+    'vacinacao': vacinacao,
+    'testes': testes,
+    'mapa': mapa,
+}
@@ -0,0 +1,356 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+from atualizar_views import atualizar_views_materializadas, carga_sem_rollup
+from limpeza import query_exportacao
+
+# ==============================================================================
+# SUÍTE DE REGRESSÃO DE PERFORMANCE SQL
+# ==============================================================================
+# Carrega um dataset sintético num PostgreSQL LOCAL e DEDICADO (BENCH_DB_NAME),
+# mede as views, a função de indicadores e a query de exportação do limpeza.py
+# com EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) e compara com um baseline salvo.
+#
+#   python benchmark_sql.py --linhas 100000 --salvar-baseline   (gera o baseline)
+#   python benchmark_sql.py --linhas 100000                     (compara; sai com 1 se regredir)
+#
+# ATENÇÃO: o schema public do banco BENCH_DB_NAME é apagado e recriado.
+
+ARQUIVOS_SCHEMA = [
+    'banco.sql',
+    'auditoria.sql',
+    'calculos.sql',
+    'views.sql',
+    'views_materializadas.sql',
+    'casos_diarios.sql',
+]
+
+PERIODO_INICIO = date(2020, 3, 1)
+PERIODO_FIM = date(2023, 12, 31)
+
+CONSULTAS = {
+    'vw_casos_por_municipio': "SELECT * FROM vw_casos_por_municipio",
+    'vw_vacinacao_por_resultado': "SELECT * FROM vw_vacinacao_por_resultado",
+    'vw_sintomas_frequentes': "SELECT * FROM vw_sintomas_frequentes",
+    'mvw_casos_por_municipio': "SELECT * FROM mvw_casos_por_municipio",
+    'mvw_vacinacao_por_resultado': "SELECT * FROM mvw_vacinacao_por_resultado",
+    'mvw_sintomas_frequentes': "SELECT * FROM mvw_sintomas_frequentes ORDER BY frequencia_em_confirmados DESC",
+    'vw_casos_diarios': "SELECT * FROM vw_casos_diarios",
+    'fx_calcular_taxa_positividade': "SELECT fx_calcular_taxa_positividade('2021-01-01', '2021-01-31')",
+    'query_exportacao': query_exportacao.strip().rstrip(';'),
+}
+
+# Valores no formato que o insercao.py grava (texto do e-SUS / códigos limpos)
+CLASSIFICACOES = ['Confirmado Laboratorial', 'Confirmado Clínico-Epidemiológico', 'Confirmado por Critério Clínico',
+                  'Descartado', 'Síndrome Gripal Não Especificada', None]
+EVOLUCOES = ['Cura', 'Óbito', 'Em tratamento domiciliar', 'Internado', 'Ignorado', None]
+SINTOMAS = ['Febre', 'Tosse', 'Dor de Garganta', 'Dispneia', 'Coriza', 'Dor de Cabeça',
+            'Distúrbios Olfativos', 'Distúrbios Gustativos', 'Assintomático', 'Outros']
+CONDICOES = ['Diabetes', 'Doenças cardíacas crônicas', 'Obesidade', 'Imunossupressão', 'Gestante']
+RACAS = ['Branca', 'Preta', 'Amarela', 'Parda', 'Indígena', 'Ignorado']
+SEXOS = ['Feminino', 'Masculino', 'Indefinido']
+LABORATORIOS = ['SINOVAC/BUTANTAN', 'ASTRAZENECA/FIOCRUZ', 'PFIZER', 'JANSSEN']
+
+
+def _sequencial(qtd):
+    """Numeração 1..q dentro de cada grupo repetido (ex.: nº da dose de cada notificação)."""
+    inicio_grupo = np.repeat(np.cumsum(qtd) - qtd, qtd)
+    return np.arange(qtd.sum()) - inicio_grupo + 1
+
+
+def gerar_dados_sinteticos(n_linhas, semente=42, n_municipios=144):
+    """Gera as tabelas normalizadas (mesmo schema do banco.sql) com n_linhas notificações."""
+    rng = np.random.default_rng(semente)
+    ids = np.arange(1, n_linhas + 1, dtype=np.int64)
+
+    estados = pd.DataFrame([{'estado_ibge': 15, 'nome': 'Pará', 'sigla': 'PA'}])
+    municipios = pd.DataFrame({
+        'municipio_ibge': 1500000 + np.arange(n_municipios) * 10,
+        'nome': [f'Município {i:03d}' for i in range(n_municipios)],
+        'estado_ibge': 15,
+    })
+
+    # Distribuição desigual entre municípios (poucos concentram a maioria, como na base real)
+    pesos = 1.0 / np.arange(1, n_municipios + 1)
+    mun = rng.choice(municipios['municipio_ibge'].to_numpy(), size=n_linhas, p=pesos / pesos.sum())
+    dias_periodo = (PERIODO_FIM - PERIODO_INICIO).days
+    data_not = pd.to_datetime(PERIODO_INICIO) + pd.to_timedelta(rng.integers(0, dias_periodo, n_linhas), unit='D')
+
+    notificacao = pd.DataFrame({
+        'notificacao_id': ids,
+        'source_id': [f'src{i}' for i in ids],
+        'data_notificacao': data_not.date,
+        'municipio_notificacao_ibge': mun,
+        'estado_notificacao_ibge': 15,
+        'excluido': rng.random(n_linhas) < 0.02,
+        'validado': rng.random(n_linhas) < 0.7,
+    })
+
+    demograficos = pd.DataFrame({
+        'notificacao_id': ids,
+        'idade': pd.array(rng.integers(0, 100, n_linhas), dtype='Int64'),
+        'sexo': rng.choice(SEXOS, n_linhas),
+        'raca_cor': rng.choice(RACAS, n_linhas),
+        'is_profissional_saude': rng.choice(['Sim', 'Não'], n_linhas, p=[0.08, 0.92]),
+        'is_profissional_seguranca': rng.choice(['Sim', 'Não'], n_linhas, p=[0.03, 0.97]),
+        'cbo': None,
+        'pertence_comunidade_tradicional': None,
+    })
+
+    inicio_sintomas = data_not - pd.to_timedelta(rng.integers(0, 10, n_linhas), unit='D')
+    clinicos = pd.DataFrame({
+        'notificacao_id': ids,
+        'data_inicio_sintomas': inicio_sintomas.date,
+        'data_encerramento': (data_not + pd.to_timedelta(rng.integers(5, 30, n_linhas), unit='D')).date,
+        'classificacao_final': rng.choice(np.array(CLASSIFICACOES, dtype=object), n_linhas),
+        'evolucao_caso': rng.choice(np.array(EVOLUCOES, dtype=object), n_linhas, p=[0.6, 0.02, 0.2, 0.03, 0.05, 0.1]),
+        'outros_sintomas': None,
+        'outras_condicoes': None,
+        'total_testes_realizados': pd.array(rng.integers(0, 3, n_linhas), dtype='Int64'),
+    })
+
+    sintoma = pd.DataFrame({'sintoma_id': np.arange(1, len(SINTOMAS) + 1), 'nome': SINTOMAS})
+    condicao = pd.DataFrame({'condicao_id': np.arange(1, len(CONDICOES) + 1), 'nome': CONDICOES})
+
+    # Relações N:N (cada notificação recebe de 0 a 4 sintomas e de 0 a 1 condição)
+    qtd_sint = rng.integers(0, 5, n_linhas)
+    not_sint = pd.DataFrame({
+        'notificacao_id': np.repeat(ids, qtd_sint),
+        'sintoma_id': rng.integers(1, len(SINTOMAS) + 1, qtd_sint.sum()),
+    }).drop_duplicates()
+    tem_cond = rng.random(n_linhas) < 0.2
+    not_cond = pd.DataFrame({
+        'notificacao_id': ids[tem_cond],
+        'condicao_id': rng.integers(1, len(CONDICOES) + 1, tem_cond.sum()),
+    })
+
+    # Testes: 0 a 2 por notificação
+    qtd_testes = clinicos['total_testes_realizados'].to_numpy(dtype=np.int64)
+    id_teste = np.repeat(ids, qtd_testes)
+    testes = pd.DataFrame({
+        'notificacao_id': id_teste,
+        'numero_sequencial': _sequencial(qtd_testes),
+        'tipo_teste': rng.choice(['1', '2', '3', '4', '5', '6'], len(id_teste)),
+        'fabricante_teste': rng.choice([str(c) for c in range(100, 130)], len(id_teste)),
+        'resultado_teste': rng.choice(['1', '2', '3', 'Positivo', 'Negativo'], len(id_teste)),
+        'estado_teste': rng.choice(['1', '2', '3'], len(id_teste)),
+        'data_coleta': data_not.repeat(qtd_testes).date,
+    })
+
+    # Vacinas: 0, 1 ou 2 doses
+    qtd_doses = rng.choice([0, 1, 2], n_linhas, p=[0.4, 0.2, 0.4])
+    id_vac = np.repeat(ids, qtd_doses)
+    vacinas = pd.DataFrame({
+        'notificacao_id': id_vac,
+        'dose_numero': _sequencial(qtd_doses),
+        'data_aplicacao': (pd.to_datetime(PERIODO_INICIO) + pd.to_timedelta(rng.integers(0, dias_periodo, len(id_vac)), unit='D')).date,
+        'laboratorio': rng.choice(LABORATORIOS, len(id_vac)),
+        'lote': None,
+    })
+
+    # Ordem respeita as FKs
+    return {
+        'estado': estados,
+        'municipio': municipios,
+        'notificacao': notificacao,
+        'dados_demograficos': demograficos,
+        'dados_clinicos': clinicos,
+        'sintoma': sintoma,
+        'notificacao_sintoma': not_sint,
+        'condicao': condicao,
+        'notificacao_condicao': not_cond,
+        'teste_laboratorial': testes,
+        'vacina_aplicada': vacinas,
+    }
+
+
+def preparar_schema(engine):
+    """Recria o schema public do banco de benchmark e executa os scripts SQL do projeto."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("DROP SCHEMA IF EXISTS public CASCADE; CREATE SCHEMA public;")
+        for arquivo in ARQUIVOS_SCHEMA:
+            with open(arquivo, encoding='utf-8') as f:
+                cur.execute(f.read())
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def carregar_dados(engine, tabelas):
+    """Carga em massa via COPY (bem mais rápido que to_sql para volumes grandes)."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for tabela, df in tabelas.items():
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            colunas = ', '.join(df.columns)
+            cur.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+            print(f"   -> {tabela}: {len(df)} linhas")
+        raw.commit()
+        # Acerta as sequências SERIAL depois de inserir IDs explícitos
+        cur.execute("SELECT setval('sintoma_sintoma_id_seq', (SELECT MAX(sintoma_id) FROM sintoma))")
+        cur.execute("SELECT setval('condicao_condicao_id_seq', (SELECT MAX(condicao_id) FROM condicao))")
+        raw.commit()
+    finally:
+        raw.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def medir_consulta(conn, sql, repeticoes):
+    """Executa EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) e devolve as métricas e o último plano.
+
+    A primeira execução aquece o cache e é descartada.
+    """
+    explain = text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+    conn.execute(explain)
+
+    tempos = []
+    plano = None
+    for _ in range(repeticoes):
+        plano = conn.execute(explain).scalar()
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        plano = plano[0]
+        tempos.append(plano['Planning Time'] + plano['Execution Time'])
+
+    raiz = plano['Plan']
+    metricas = {
+        'latencia_ms_mediana': round(statistics.median(tempos), 3),
+        'latencia_ms_min': round(min(tempos), 3),
+        'latencia_ms_max': round(max(tempos), 3),
+        'shared_hit': raiz.get('Shared Hit Blocks', 0),
+        'shared_read': raiz.get('Shared Read Blocks', 0),
+    }
+    # Buffers totais (hit + read): estável entre execuções, ao contrário da divisão hit/read
+    metricas['buffers'] = metricas['shared_hit'] + metricas['shared_read']
+    return metricas, plano
+
+
+def comparar_com_baseline(resultados, baseline, limite_latencia, limite_buffers):
+    """Retorna a lista de regressões (consulta, métrica, atual, baseline, razão)."""
+    regressoes = []
+    for nome, atual in resultados.items():
+        ref = baseline.get('consultas', {}).get(nome)
+        if not ref:
+            print(f"   [AVISO] {nome} não existe no baseline (nova consulta?)")
+            continue
+        for metrica, limite in [('latencia_ms_mediana', limite_latencia), ('buffers', limite_buffers)]:
+            if not ref[metrica]:
+                continue
+            razao = atual[metrica] / ref[metrica]
+            if razao > limite:
+                regressoes.append((nome, metrica, atual[metrica], ref[metrica], razao))
+    return regressoes
+
+
+def imprimir_resultados(resultados, baseline):
+    print(f"\n{'Consulta':<32}{'Mediana (ms)':>14}{'Baseline':>12}{'Buffers':>10}{'Baseline':>10}")
+    print("-" * 78)
+    for nome, m in resultados.items():
+        ref = baseline.get('consultas', {}).get(nome, {}) if baseline else {}
+        print(f"{nome:<32}{m['latencia_ms_mediana']:>14.2f}{ref.get('latencia_ms_mediana', float('nan')):>12.2f}"
+              f"{m['buffers']:>10}{str(ref.get('buffers', '-')):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão de performance das views, indicadores e exportação.")
+    parser.add_argument('--linhas', type=int, default=50000, help="Notificações sintéticas a gerar")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=5, help="Execuções medidas por consulta")
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava os resultados como novo baseline")
+    parser.add_argument('--limite-latencia', type=float, default=1.30,
+                        help="Falha se a mediana passar de baseline x limite (padrão 1.30 = +30%%)")
+    parser.add_argument('--limite-buffers', type=float, default=1.10,
+                        help="Falha se os buffers passarem de baseline x limite (padrão 1.10 = +10%%)")
+    parser.add_argument('--sem-carga', action='store_true', help="Reaproveita os dados já carregados no banco")
+    parser.add_argument('--planos', help="Diretório para salvar os planos EXPLAIN em JSON")
+    parser.add_argument('--consultas', nargs='*', choices=list(CONSULTAS), help="Mede só as consultas indicadas")
+    args = parser.parse_args()
+
+    load_dotenv()
+    bench_db = os.getenv('BENCH_DB_NAME')
+    if not bench_db or bench_db == os.getenv('DB_NAME'):
+        print("[ERRO] Defina BENCH_DB_NAME com um banco dedicado (diferente de DB_NAME): o schema será apagado.")
+        sys.exit(1)
+
+    conn_str = (f"postgresql+psycopg2://{os.getenv('BENCH_DB_USER', os.getenv('DB_USER'))}:"
+                f"{os.getenv('BENCH_DB_PASS', os.getenv('DB_PASS'))}@"
+                f"{os.getenv('BENCH_DB_HOST', os.getenv('DB_HOST', 'localhost'))}:5432/{bench_db}")
+    engine = create_engine(conn_str)
+
+    if not args.sem_carga:
+        print(f">> 1. Recriando schema em '{bench_db}'...")
+        preparar_schema(engine)
+        print(f">> 2. Gerando e carregando {args.linhas} notificações sintéticas...")
+        with carga_sem_rollup(engine):
+            carregar_dados(engine, gerar_dados_sinteticos(args.linhas, args.semente))
+        print(">> 3. Atualizando views materializadas...")
+        atualizar_views_materializadas(engine)
+
+    print(f">> 4. Medindo consultas ({args.repeticoes} repetições)...")
+    resultados = {}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for nome in args.consultas or CONSULTAS:
+            resultados[nome], plano = medir_consulta(conn, CONSULTAS[nome], args.repeticoes)
+            print(f"   -> {nome}: {resultados[nome]['latencia_ms_mediana']:.2f} ms")
+            if args.planos:
+                os.makedirs(args.planos, exist_ok=True)
+                with open(os.path.join(args.planos, f'{nome}.json'), 'w', encoding='utf-8') as f:
+                    json.dump(plano, f, indent=2)
+
+    execucao = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'linhas': args.linhas,
+        'semente': args.semente,
+        'repeticoes': args.repeticoes,
+        'consultas': resultados,
+    }
+
+    if args.salvar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(execucao, f, indent=2, ensure_ascii=False)
+        imprimir_resultados(resultados, None)
+        print(f"\n>> Baseline salvo em {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        imprimir_resultados(resultados, None)
+        print(f"\n[AVISO] Baseline {args.baseline} não encontrado. Rode com --salvar-baseline primeiro.")
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline.get('linhas'), baseline.get('semente')) != (args.linhas, args.semente):
+        print(f"   [AVISO] Baseline gerado com {baseline.get('linhas')} linhas / semente {baseline.get('semente')}: "
+              f"a comparação não é equivalente.")
+
+    imprimir_resultados(resultados, baseline)
+    regressoes = comparar_com_baseline(resultados, baseline, args.limite_latencia, args.limite_buffers)
+    if regressoes:
+        print("\n[REGRESSÃO DETECTADA]")
+        for nome, metrica, atual, ref, razao in regressoes:
+            print(f"   {nome}: {metrica} {atual} vs baseline {ref} ({razao:.2f}x)")
+        sys.exit(1)
+
+    print("\n>> Nenhuma regressão acima dos limites.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ==============================================================================
+# CACHE DE FIGURAS PLOTLY COMPARTILHADO ENTRE SESSÕES
+# ==============================================================================
+# A maioria das sessões abre a mesma visão (filtro padrão), e montar a figura
+# (px.bar, make_subplots...) custa bem mais que a agregação em cache. As figuras
+# prontas ficam num LRU do processo, chaveado por (id do gráfico, estado do
+# filtro, versão dos dados) e limitado por número de figuras e por tamanho.
+# O tamanho é estimado pela quantidade de valores nos arrays dos traços (serializar
+# a figura só para medir custaria quase tanto quanto construí-la). Sessões simultâneas pedindo uma figura ainda não
+# construída esperam a primeira construção em vez de repeti-la.
+#
+# Guardamos o objeto Figure, não o JSON: é a forma que o st.plotly_chart
+# serializa direto; um dict/JSON seria revalidado pelo Plotly a cada rerun.
+# As figuras são compartilhadas: não modificar depois de obter.
+
+
+# Propriedades dos traços que carregam os dados (bar, scatter, pie, heatmap, icicle...)
+PROPRIEDADES_DADOS = ('x', 'y', 'z', 'text', 'hovertext', 'customdata', 'values', 'labels', 'parents', 'ids')
+# Estimativa: bytes por valor de array e bytes fixos por figura (layout, template)
+BYTES_POR_VALOR = 16
+BYTES_POR_FIGURA = 8 * 1024
+
+
+def tamanho_estimado(figura):
+    """Bytes aproximados da figura, sem serializá-la."""
+    valores = 0
+    for traco in figura.data:
+        for nome in PROPRIEDADES_DADOS:
+            v = getattr(traco, nome, None)
+            if isinstance(v, np.ndarray):
+                valores += v.size
+            elif isinstance(v, (list, tuple)):
+                # Matrizes (z do heatmap) em listas de listas
+                valores += len(v) * (len(v[0]) if v and isinstance(v[0], (list, tuple, np.ndarray)) else 1)
+    return BYTES_POR_FIGURA + valores * BYTES_POR_VALOR
+
+
+class _EmConstrucao:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.figura = None
+        self.erro = None
+
+
+class CacheFiguras:
+    def __init__(self, max_figuras=256, max_mb=64):
+        self.max_figuras = max_figuras
+        self.max_bytes = max_mb * 1024 ** 2
+        self._itens = OrderedDict()   # chave -> (figura, bytes)
+        self._em_construcao = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, construir):
+        """Figura da chave, construída por construir() só se não estiver em cache."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[0]
+
+            construcao = self._em_construcao.get(chave)
+            dono = construcao is None
+            if dono:
+                self.faltas += 1
+                construcao = self._em_construcao[chave] = _EmConstrucao()
+
+        if not dono:
+            construcao.pronto.wait()
+            if construcao.erro is not None:
+                raise construcao.erro
+            return construcao.figura
+
+        try:
+            construcao.figura = construir()
+            tamanho = tamanho_estimado(construcao.figura)
+            with self._lock:
+                self._itens[chave] = (construcao.figura, tamanho)
+                self._bytes += tamanho
+                while self._itens and (len(self._itens) > self.max_figuras or self._bytes > self.max_bytes):
+                    _, (_, removido) = self._itens.popitem(last=False)
+                    self._bytes -= removido
+        except Exception as e:
+            construcao.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_construcao.pop(chave, None)
+            construcao.pronto.set()
+        return construcao.figura
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'figuras': len(self._itens),
+                'mb': self._bytes / 1024 ** 2,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
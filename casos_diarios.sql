@@ -0,0 +1,260 @@
+-- ============================================================================
+-- ETAPA 3.4: ROLLUP DIÁRIO DE CASOS (MANTIDO INCREMENTALMENTE POR TRIGGERS)
+-- ============================================================================
+-- Mesmo conteúdo de vw_casos_por_municipio (município x dia), mas gravado em
+-- tabela e atualizado linha a linha pelos triggers abaixo. A leitura para os
+-- gráficos de série temporal não reagrega mais notificacao x dados_clinicos.
+--
+-- Regras (iguais às da view):
+--   * Só entra notificação com dados_clinicos, excluido = FALSE e município/data preenchidos
+--   * Confirmado: classificacao_final ILIKE '%Confirmado%' ou '%Laboratorial%'
+--   * Descartado: classificacao_final ILIKE '%Descartado%'
+--   * Óbito: evolucao_caso ILIKE '%Óbito%' ou '%Falecimento%'
+
+CREATE TABLE IF NOT EXISTS casos_diarios (
+    municipio_ibge INTEGER REFERENCES municipio(municipio_ibge),
+    data_notificacao DATE,
+    total_notificacoes INTEGER NOT NULL DEFAULT 0,
+    casos_confirmados INTEGER NOT NULL DEFAULT 0,
+    casos_descartados INTEGER NOT NULL DEFAULT 0,
+    obitos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (municipio_ibge, data_notificacao)
+);
+
+CREATE INDEX IF NOT EXISTS idx_casos_diarios_data ON casos_diarios(data_notificacao);
+
+-- 1. Função auxiliar: soma (p_sinal = 1) ou subtrai (p_sinal = -1) a contribuição de UMA notificação
+CREATE OR REPLACE FUNCTION fx_casos_diarios_aplicar(
+    p_municipio INTEGER,
+    p_data DATE,
+    p_excluido BOOLEAN,
+    p_classificacao VARCHAR,
+    p_evolucao VARCHAR,
+    p_sinal INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    -- Mesmo critério do WHERE n.excluido = FALSE da view (NULL não entra)
+    IF p_excluido IS DISTINCT FROM FALSE OR p_municipio IS NULL OR p_data IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO casos_diarios AS cd (
+        municipio_ibge, data_notificacao,
+        total_notificacoes, casos_confirmados, casos_descartados, obitos
+    )
+    VALUES (
+        p_municipio, p_data,
+        p_sinal,
+        CASE WHEN p_classificacao ILIKE '%Confirmado%' OR p_classificacao ILIKE '%Laboratorial%' THEN p_sinal ELSE 0 END,
+        CASE WHEN p_classificacao ILIKE '%Descartado%' THEN p_sinal ELSE 0 END,
+        CASE WHEN p_evolucao ILIKE '%Óbito%' OR p_evolucao ILIKE '%Falecimento%' THEN p_sinal ELSE 0 END
+    )
+    ON CONFLICT (municipio_ibge, data_notificacao)
+    DO UPDATE SET
+        total_notificacoes = cd.total_notificacoes + EXCLUDED.total_notificacoes,
+        casos_confirmados = cd.casos_confirmados + EXCLUDED.casos_confirmados,
+        casos_descartados = cd.casos_descartados + EXCLUDED.casos_descartados,
+        obitos = cd.obitos + EXCLUDED.obitos;
+
+    -- Remove células que zeraram (ex.: todas as notificações do dia foram excluídas)
+    IF p_sinal < 0 THEN
+        DELETE FROM casos_diarios
+        WHERE municipio_ibge = p_municipio
+          AND data_notificacao = p_data
+          AND total_notificacoes <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2. Trigger em dados_clinicos (é aqui que a notificação passa a contar)
+CREATE OR REPLACE FUNCTION fx_casos_diarios_clinicos()
+RETURNS TRIGGER AS $$
+DECLARE
+    reg_notificacao RECORD;
+BEGIN
+    IF (TG_OP IN ('UPDATE', 'DELETE')) THEN
+        SELECT municipio_notificacao_ibge, data_notificacao, excluido
+        INTO reg_notificacao
+        FROM notificacao WHERE notificacao_id = OLD.notificacao_id;
+
+        -- Se a notificação não existe mais (DELETE em cascata), o trigger
+        -- BEFORE DELETE da notificacao já descontou a contribuição.
+        IF FOUND THEN
+            PERFORM fx_casos_diarios_aplicar(
+                reg_notificacao.municipio_notificacao_ibge, reg_notificacao.data_notificacao, reg_notificacao.excluido,
+                OLD.classificacao_final, OLD.evolucao_caso, -1
+            );
+        END IF;
+    END IF;
+
+    IF (TG_OP IN ('INSERT', 'UPDATE')) THEN
+        SELECT municipio_notificacao_ibge, data_notificacao, excluido
+        INTO reg_notificacao
+        FROM notificacao WHERE notificacao_id = NEW.notificacao_id;
+
+        IF FOUND THEN
+            PERFORM fx_casos_diarios_aplicar(
+                reg_notificacao.municipio_notificacao_ibge, reg_notificacao.data_notificacao, reg_notificacao.excluido,
+                NEW.classificacao_final, NEW.evolucao_caso, 1
+            );
+        END IF;
+        RETURN NEW;
+    END IF;
+
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_casos_diarios_clinicos ON dados_clinicos;
+CREATE TRIGGER trg_casos_diarios_clinicos
+AFTER INSERT OR UPDATE OR DELETE ON dados_clinicos
+FOR EACH ROW EXECUTE FUNCTION fx_casos_diarios_clinicos();
+
+-- 3. Trigger em notificacao (mudança de município, data ou exclusão lógica)
+-- No INSERT ainda não existe dados_clinicos (FK), então não há o que somar.
+CREATE OR REPLACE FUNCTION fx_casos_diarios_notificacao()
+RETURNS TRIGGER AS $$
+DECLARE
+    reg_clinico RECORD;
+BEGIN
+    IF (TG_OP = 'UPDATE') THEN
+        IF (OLD.municipio_notificacao_ibge IS NOT DISTINCT FROM NEW.municipio_notificacao_ibge
+            AND OLD.data_notificacao IS NOT DISTINCT FROM NEW.data_notificacao
+            AND OLD.excluido IS NOT DISTINCT FROM NEW.excluido) THEN
+            RETURN NEW;
+        END IF;
+
+        SELECT classificacao_final, evolucao_caso
+        INTO reg_clinico
+        FROM dados_clinicos WHERE notificacao_id = NEW.notificacao_id;
+
+        IF FOUND THEN
+            PERFORM fx_casos_diarios_aplicar(
+                OLD.municipio_notificacao_ibge, OLD.data_notificacao, OLD.excluido,
+                reg_clinico.classificacao_final, reg_clinico.evolucao_caso, -1
+            );
+            PERFORM fx_casos_diarios_aplicar(
+                NEW.municipio_notificacao_ibge, NEW.data_notificacao, NEW.excluido,
+                reg_clinico.classificacao_final, reg_clinico.evolucao_caso, 1
+            );
+        END IF;
+        RETURN NEW;
+
+    ELSIF (TG_OP = 'DELETE') THEN
+        -- BEFORE DELETE: dados_clinicos ainda existe (o CASCADE roda depois)
+        SELECT classificacao_final, evolucao_caso
+        INTO reg_clinico
+        FROM dados_clinicos WHERE notificacao_id = OLD.notificacao_id;
+
+        IF FOUND THEN
+            PERFORM fx_casos_diarios_aplicar(
+                OLD.municipio_notificacao_ibge, OLD.data_notificacao, OLD.excluido,
+                reg_clinico.classificacao_final, reg_clinico.evolucao_caso, -1
+            );
+        END IF;
+        RETURN OLD;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_casos_diarios_notificacao_upd ON notificacao;
+CREATE TRIGGER trg_casos_diarios_notificacao_upd
+AFTER UPDATE ON notificacao
+FOR EACH ROW EXECUTE FUNCTION fx_casos_diarios_notificacao();
+
+DROP TRIGGER IF EXISTS trg_casos_diarios_notificacao_del ON notificacao;
+CREATE TRIGGER trg_casos_diarios_notificacao_del
+BEFORE DELETE ON notificacao
+FOR EACH ROW EXECUTE FUNCTION fx_casos_diarios_notificacao();
+
+-- 4. Recalculo completo (mesma agregação da view, restrita às regras acima)
+CREATE OR REPLACE VIEW vw_casos_diarios_recalculo AS
+SELECT
+    n.municipio_notificacao_ibge AS municipio_ibge,
+    n.data_notificacao,
+    COUNT(*)::INTEGER AS total_notificacoes,
+    COUNT(*) FILTER (
+        WHERE c.classificacao_final ILIKE '%Confirmado%'
+           OR c.classificacao_final ILIKE '%Laboratorial%'
+    )::INTEGER AS casos_confirmados,
+    COUNT(*) FILTER (
+        WHERE c.classificacao_final ILIKE '%Descartado%'
+    )::INTEGER AS casos_descartados,
+    COUNT(*) FILTER (
+        WHERE c.evolucao_caso ILIKE '%Óbito%'
+           OR c.evolucao_caso ILIKE '%Falecimento%'
+    )::INTEGER AS obitos
+FROM notificacao n
+JOIN dados_clinicos c ON n.notificacao_id = c.notificacao_id
+WHERE n.excluido = FALSE
+  AND n.municipio_notificacao_ibge IS NOT NULL
+  AND n.data_notificacao IS NOT NULL
+GROUP BY n.municipio_notificacao_ibge, n.data_notificacao;
+
+-- Reconstrói o rollup do zero (carga inicial ou correção após divergência)
+CREATE OR REPLACE FUNCTION fx_reconstruir_casos_diarios()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE casos_diarios IN EXCLUSIVE MODE;
+    DELETE FROM casos_diarios;
+    INSERT INTO casos_diarios
+    SELECT municipio_ibge, data_notificacao, total_notificacoes, casos_confirmados, casos_descartados, obitos
+    FROM vw_casos_diarios_recalculo;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 5. Verificador de consistência: lista as células onde o rollup difere do recálculo
+-- Uso: SELECT * FROM fx_verificar_casos_diarios();  (nenhuma linha = consistente)
+CREATE OR REPLACE FUNCTION fx_verificar_casos_diarios()
+RETURNS TABLE (
+    municipio_ibge INTEGER,
+    data_notificacao DATE,
+    total_rollup INTEGER,
+    total_recalculo INTEGER,
+    confirmados_rollup INTEGER,
+    confirmados_recalculo INTEGER,
+    descartados_rollup INTEGER,
+    descartados_recalculo INTEGER,
+    obitos_rollup INTEGER,
+    obitos_recalculo INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        COALESCE(cd.municipio_ibge, r.municipio_ibge),
+        COALESCE(cd.data_notificacao, r.data_notificacao),
+        cd.total_notificacoes, r.total_notificacoes,
+        cd.casos_confirmados, r.casos_confirmados,
+        cd.casos_descartados, r.casos_descartados,
+        cd.obitos, r.obitos
+    FROM casos_diarios cd
+    FULL OUTER JOIN vw_casos_diarios_recalculo r
+        ON cd.municipio_ibge = r.municipio_ibge
+       AND cd.data_notificacao = r.data_notificacao
+    WHERE cd.total_notificacoes IS DISTINCT FROM r.total_notificacoes
+       OR cd.casos_confirmados IS DISTINCT FROM r.casos_confirmados
+       OR cd.casos_descartados IS DISTINCT FROM r.casos_descartados
+       OR cd.obitos IS DISTINCT FROM r.obitos;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 6. View de leitura para os gráficos de série temporal (mesmas colunas de vw_casos_por_municipio)
+CREATE OR REPLACE VIEW vw_casos_diarios AS
+SELECT
+    cd.municipio_ibge,
+    m.nome AS municipio,
+    e.sigla AS uf,
+    cd.data_notificacao,
+    cd.total_notificacoes,
+    cd.casos_confirmados,
+    cd.casos_descartados,
+    cd.obitos
+FROM casos_diarios cd
+JOIN municipio m ON cd.municipio_ibge = m.municipio_ibge
+JOIN estado e ON m.estado_ibge = e.estado_ibge;
+
+-- Carga inicial do rollup com o que já está no banco
+SELECT fx_reconstruir_casos_diarios();
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# ==============================================================================
+# COMPACTAÇÃO DO DATASET DO DASHBOARD EM MEMÓRIA
+# ==============================================================================
+# O CSV chega com tudo em object/float64: strings repetidas em cada linha e
+# flags 0/1 ocupando 8 bytes. Como o motor de filtros mantém o dataset em
+# memória por processo, a compactação define quantos workers cabem por host:
+#   * só as colunas que o Dashboard usa são mantidas;
+#   * dimensões (município, sexo, raça/cor...) viram categóricas;
+#   * flags e contagens viram int8/int16 (Int8/Int16 quando há nulos);
+#   * o mês vira um inteiro (meses desde 01/1970) em vez de duas strings por
+#     linha. Agrupar pelo inteiro também ordena os meses cronologicamente.
+
+# Colunas mantidas (as multivaloradas viram índices CSR no motor de filtros)
+COLUNAS_DASHBOARD = [
+    'data_notificacao', 'municipio_nome', 'idade', 'sexo', 'raca_cor',
+    'is_profissional_saude', 'categoria_ocupacao', 'faixa_etaria', 'status_vacinal',
+    'resultado_teste_agregado', 'flg_febre', 'flg_tosse', 'flg_dispneia',
+    'testes_realizados', 'target_confirmado',
+    'sintomas_texto', 'fabricantes_vacina', 'tipos_testes_lista', 'fabricantes_teste_lista',
+]
+
+COLUNAS_CATEGORICAS = [
+    'municipio_nome', 'sexo', 'raca_cor', 'is_profissional_saude', 'categoria_ocupacao',
+    'faixa_etaria', 'status_vacinal', 'resultado_teste_agregado',
+]
+
+COLUNAS_INTEIRAS = ['idade', 'flg_febre', 'flg_tosse', 'flg_dispneia', 'testes_realizados', 'target_confirmado']
+
+
+def _menor_inteiro(serie):
+    """Menor tipo inteiro que comporta a coluna (nullable se houver nulos)."""
+    valores = serie.dropna()
+    # Colunas com frações não são contagens/flags: ficam como estão
+    if len(valores) and not np.array_equal(valores, np.round(valores)):
+        return serie
+    minimo, maximo = (valores.min(), valores.max()) if len(valores) else (0, 0)
+    for tipo in (np.int8, np.int16, np.int32):
+        info = np.iinfo(tipo)
+        if info.min <= minimo and maximo <= info.max:
+            break
+    if serie.isna().any():
+        return serie.astype(tipo.__name__.capitalize())
+    return serie.astype(tipo)
+
+
+def indice_mes(datas):
+    """Meses desde 01/1970 (Int16; nulo onde a data é nula)."""
+    meses = datas.to_numpy().astype('datetime64[M]').astype(np.int64)
+    return pd.Series(meses, index=datas.index).where(datas.notna()).astype('Int16')
+
+
+def rotulo_mes(indice):
+    """Rótulo 'MM/AAAA' (o mesmo do antigo mes_ano) de um índice de mês."""
+    ano, mes = divmod(int(indice), 12)
+    return f"{mes + 1:02d}/{1970 + ano}"
+
+
+def uso_memoria(df):
+    """Memória de cada coluna em MB (inclui o conteúdo das strings)."""
+    return df.memory_usage(deep=True, index=False) / 1024 ** 2
+
+
+def compactar(df):
+    """Devolve (df compactado, relatório de memória por coluna)."""
+    antes = pd.DataFrame({'tipo_original': df.dtypes.astype(str), 'mb_original': uso_memoria(df)})
+
+    compacto = df[[c for c in COLUNAS_DASHBOARD if c in df.columns]].copy()
+    compacto['mes'] = indice_mes(compacto['data_notificacao'])
+
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in compacto.columns:
+            compacto[coluna] = compacto[coluna].astype('category')
+
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in compacto.columns and pd.api.types.is_numeric_dtype(compacto[coluna]):
+            compacto[coluna] = _menor_inteiro(compacto[coluna])
+
+    depois = pd.DataFrame({'tipo': compacto.dtypes.astype(str), 'mb': uso_memoria(compacto)})
+    relatorio = antes.join(depois, how='outer').sort_values('mb_original', ascending=False)
+    relatorio['tipo'] = relatorio['tipo'].fillna('descartada')
+    return compacto, relatorio
+
+
+def concatenar(df, novos):
+    """Anexa linhas já compactadas sem perder os tipos (categorias viram a união das duas partes)."""
+    novos = novos.reindex(columns=df.columns)
+    colunas = {}
+    for coluna in df.columns:
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            colunas[coluna] = pd.Series(union_categoricals(
+                [df[coluna], novos[coluna].astype('category')], sort_categories=True, ignore_order=True
+            ))
+        else:
+            colunas[coluna] = pd.concat([df[coluna], novos[coluna]], ignore_index=True)
+    return pd.DataFrame(colunas)
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# CORRELAÇÃO SINTOMAS x CONFIRMAÇÃO POR ESTATÍSTICAS SUFICIENTES
+# ==============================================================================
+# Todas as variáveis do heatmap são binárias (sintoma presente, caso confirmado),
+# então a correlação de Pearson de cada par sai só de contagens:
+#   r = (n·Nxy - Nx·Ny) / sqrt((n·Nx - Nx²) · (n·Ny - Ny²))
+# Uma vez por motor, somamos por município x mês a matriz de coocorrência Z'Z
+# das colunas [sintomas..., confirmado, alvo válido, 1] (só o triângulo
+# superior, no menor tipo inteiro que comporta as contagens). Um filtro soma
+# as matrizes dos grupos selecionados: o custo depende do número de grupos, não
+# de linhas. Os meses das pontas de um período que cobre só parte do mês são
+# contados direto nas linhas (no máximo dois meses).
+#
+# target_confirmado nulo só sai dos pares com a confirmação (pares completos,
+# como no DataFrame.corr).
+#
+# O heatmap tem no máximo MAX_SINTOMAS sintomas (os mais frequentes do dataset
+# inteiro; as máscaras e as chaves de agrupamento são int64). O backend DuckDB
+# usa a mesma seleção (sintomas_heatmap) e a mesma fórmula (correlacao_pares)
+# sobre a Z'Z somada em SQL.
+
+# Sintomas mais frequentes do dataset que entram no heatmap (o app.py avisa quando há mais)
+MAX_SINTOMAS = 24
+
+# Valor do COALESCE da query_exportacao para notificações sem sintoma
+SEM_SINTOMA = 'Assintomático/Não Informado'
+
+# Grupo das linhas sem data (só entram quando não há filtro de período)
+MES_NULO = -1
+
+
+def sintomas_heatmap(contagem):
+    """(sintomas do heatmap, total de sintomas distintos) a partir da contagem de cada valor.
+
+    Mais frequentes primeiro; empates pelo nome, para os dois backends escolherem os mesmos.
+    """
+    contagem = contagem.drop(SEM_SINTOMA, errors='ignore')
+    contagem = contagem[contagem > 0].sort_index(kind='stable').sort_values(ascending=False, kind='stable')
+    return list(contagem.index[:MAX_SINTOMAS]), len(contagem)
+
+
+def correlacao_pares(m, sintomas):
+    """Matriz de correlação a partir da Z'Z das colunas [sintomas..., confirmado, alvo válido, 1].
+
+    Só os sintomas presentes no filtro, do mais frequente, + Confirmado.
+    """
+    k = len(sintomas)
+    presentes = [i for i in np.argsort(-np.diag(m)[:k], kind='stable') if m[i, i] > 0]
+    variaveis = presentes + [k]
+    # Validade de cada variável: sintoma vale em toda linha; confirmado só com alvo não nulo
+    validade = [k + 2] * len(presentes) + [k + 1]
+
+    n = m[np.ix_(validade, validade)].astype(float)
+    nx = m[np.ix_(variaveis, validade)].astype(float)   # Nx nas linhas em que y é válido
+    ny = nx.T
+    nxy = m[np.ix_(variaveis, variaveis)].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = (n * nxy - nx * ny) / np.sqrt((n * nx - nx ** 2) * (n * ny - ny ** 2))
+
+    nomes = [sintomas[i] for i in presentes] + ['Confirmado']
+    return pd.DataFrame(r, index=nomes, columns=nomes)
+
+
+class CoocorrenciaSintomas:
+    def __init__(self, indice, alvo, codigos_municipio, mes):
+        """indice: IndiceMultivalor de sintomas_texto; demais argumentos alinhados às linhas."""
+        self.indice = indice
+        self.sintomas, self.total_sintomas = sintomas_heatmap(pd.Series(indice.contar(), index=indice.valores))
+        # Código do valor no índice -> bit do sintoma (-1: fora do heatmap)
+        self._bit = np.full(len(indice.valores), -1, dtype=np.int8)
+        self._bit[pd.Index(indice.valores).get_indexer(self.sintomas)] = np.arange(len(self.sintomas))
+
+        alvo = pd.to_numeric(alvo, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        self._valido = ~np.isnan(alvo)
+        self._confirmado = alvo == 1
+
+        k = len(self.sintomas)
+        self.colunas = k + 3   # sintomas, confirmado, válido, 1
+        self._triangulo = np.triu_indices(self.colunas)
+
+        # Grupo = município x mês (mês relativo ao primeiro do dataset; 0 = sem data)
+        mes = mes.to_numpy(dtype=np.int64, na_value=MES_NULO)
+        inicio = mes[mes != MES_NULO].min(initial=0)
+        mes_relativo = np.where(mes == MES_NULO, 0, mes - inicio + 1)
+        n_meses = int(mes_relativo.max(initial=0)) + 1
+        grupo = (codigos_municipio.astype(np.int64) + 1) * n_meses + mes_relativo
+
+        # Linhas iguais em (grupo, combinação de sintomas, estado do alvo) viram uma
+        # chave só, com a contagem: a soma por grupo percorre chaves, não linhas
+        estado = self._valido.astype(np.int64) + self._confirmado
+        chaves, contagens = np.unique((grupo << (k + 2)) | (self._mascaras(None) << 2) | estado, return_counts=True)
+        grupos, grupo_da_chave = np.unique(chaves >> (k + 2), return_inverse=True)
+        self.grupo_municipio = (grupos // n_meses - 1).astype(np.int32)
+        self.grupo_mes = np.where(grupos % n_meses == 0, MES_NULO, grupos % n_meses - 1 + inicio).astype(np.int32)
+
+        mascara, estado = (chaves >> 2) & ((1 << k) - 1), chaves & 3
+        z = self._matriz_z(mascara, estado > 0, estado > 1)
+        tabela = np.empty((len(grupos), len(self._triangulo[0])), dtype=np.int64)
+        for p, (i, j) in enumerate(zip(*self._triangulo)):
+            tabela[:, p] = np.bincount(grupo_da_chave, weights=contagens * (z[:, i] & z[:, j]), minlength=len(grupos))
+        self.tabela = tabela.astype(np.min_scalar_type(tabela.max(initial=0)))
+
+    @property
+    def nbytes(self):
+        return self.tabela.nbytes + self.grupo_municipio.nbytes + self.grupo_mes.nbytes
+
+    def _mascaras(self, linhas):
+        # Bits dos sintomas de cada linha (int64: até 63 sintomas)
+        n = len(self.indice) if linhas is None else len(linhas)
+        posicao, codigos = self.indice.entradas(linhas)
+        bits = self._bit[codigos]
+        mascara = np.zeros(n, dtype=np.int64)
+        np.bitwise_or.at(mascara, posicao[bits >= 0], np.left_shift(1, bits[bits >= 0].astype(np.int64)))
+        return mascara
+
+    def _matriz_z(self, mascara, valido, confirmado):
+        k = len(self.sintomas)
+        z = np.empty((len(mascara), self.colunas), dtype=bool)
+        z[:, :k] = (mascara[:, None] >> np.arange(k)) & 1
+        z[:, k] = confirmado
+        z[:, k + 1] = valido
+        z[:, k + 2] = True
+        return z
+
+    def matriz(self, grupos, linhas=None):
+        """Z'Z completa (simétrica) dos grupos selecionados (máscara booleana) + linhas avulsas."""
+        m = np.zeros((self.colunas, self.colunas), dtype=np.int64)
+        m[self._triangulo] = self.tabela[grupos].sum(axis=0, dtype=np.int64)
+        m = m + np.triu(m, 1).T
+        if linhas is not None and len(linhas):
+            # float64 usa o BLAS e é exato para contagens abaixo de 2**53
+            z = self._matriz_z(self._mascaras(linhas), self._valido[linhas], self._confirmado[linhas]).astype(np.float64)
+            m += np.rint(z.T @ z).astype(np.int64)
+        return m
+
+    def correlacao(self, m):
+        """Matriz de correlação (sintomas presentes no filtro, do mais frequente, + Confirmado)."""
+        return correlacao_pares(m, self.sintomas)
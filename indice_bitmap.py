@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# ÍNDICES BITMAP PARA AS DIMENSÕES CATEGÓRICAS
+# ==============================================================================
+# Um bitset por valor (cada município, cada status vacinal...), montado no
+# carregamento sobre as linhas já ordenadas por data. Como o filtro de período
+# é um intervalo contínuo de linhas [a, b), ele vira uma faixa de palavras de
+# 64 bits; o filtro de municípios é o OR dos bitsets escolhidos nessa faixa, e
+# a contagem de cada valor é um popcount da interseção com o filtro.
+#
+# Compressão por valor, como nos containers do Roaring: valores frequentes
+# ficam densos (1 bit por linha, em palavras uint64); valores raros, com menos
+# de 1 linha a cada DENSIDADE_MINIMA, entram numa lista única de (linha, código)
+# ordenada pela linha, da qual a faixa de datas é uma fatia contínua.
+
+DENSIDADE_MINIMA = 32
+
+_POPCOUNT_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(palavras):
+    """Total de bits ligados em um array uint64."""
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+        return int(np.bitwise_count(palavras).sum(dtype=np.int64))
+    return int(_POPCOUNT_BYTE[palavras.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _empacotar(bits):
+    """Array booleano -> palavras uint64 (bit i da linha i, little-endian)."""
+    bytes_ = np.packbits(bits, bitorder='little')
+    preenchido = np.zeros(-(-len(bytes_) // 8) * 8, dtype=np.uint8)
+    preenchido[:len(bytes_)] = bytes_
+    return preenchido.view('<u8')
+
+
+def intervalo(a, b):
+    """Faixa de palavras (primeira palavra, palavras) com os bits das linhas [a, b) ligados."""
+    if b <= a:
+        return a // 64, np.zeros(0, dtype='<u8')
+    primeira, ultima = a // 64, (b - 1) // 64
+    palavras = np.full(ultima - primeira + 1, np.iinfo(np.uint64).max, dtype='<u8')
+    palavras[0] &= np.uint64(np.iinfo(np.uint64).max) << np.uint64(a % 64)
+    palavras[-1] &= np.uint64(np.iinfo(np.uint64).max) >> np.uint64(63 - (b - 1) % 64)
+    return primeira, palavras
+
+
+def posicoes(primeira, palavras):
+    """Posições (linhas) dos bits ligados, em ordem."""
+    bits = np.unpackbits(palavras.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits) + primeira * 64
+
+
+class IndiceBitmap:
+    def __init__(self, valores, densos, linhas_esparsas, codigos_esparsos):
+        self.valores = valores
+        self.densos = densos                      # código -> palavras uint64 (todas as linhas)
+        self.linhas_esparsas = linhas_esparsas    # linhas dos valores raros, em ordem
+        self.codigos_esparsos = codigos_esparsos  # código de cada uma delas
+
+    @classmethod
+    def construir(cls, serie):
+        categorias = pd.Categorical(serie)
+        codigos = categorias.codes
+        n = len(codigos)
+        contagem = np.bincount(codigos[codigos >= 0], minlength=len(categorias.categories))
+
+        densos = {}
+        for codigo in np.flatnonzero(contagem * DENSIDADE_MINIMA >= n):
+            densos[int(codigo)] = _empacotar(codigos == codigo)
+
+        raro = np.zeros(len(contagem) + 1, dtype=bool)   # última posição: código -1 (nulo)
+        raro[:-1] = contagem * DENSIDADE_MINIMA < n
+        linhas = np.flatnonzero(raro[codigos])
+        return cls(np.asarray(categorias.categories, dtype=object), densos,
+                   linhas.astype(np.int32), codigos[linhas].copy())
+
+    @property
+    def nbytes(self):
+        return sum(p.nbytes for p in self.densos.values()) + self.linhas_esparsas.nbytes + self.codigos_esparsos.nbytes
+
+    def _esparsos_na_faixa(self, primeira, palavras):
+        # (código, posição relativa à primeira palavra) das linhas raras dentro da faixa
+        a, b = np.searchsorted(self.linhas_esparsas, [primeira * 64, (primeira + len(palavras)) * 64])
+        deslocadas = self.linhas_esparsas[a:b] - primeira * 64
+        return self.codigos_esparsos[a:b], deslocadas
+
+    def ou(self, codigos, primeira, palavras):
+        """OR dos bitsets dos códigos, restrito à faixa (primeira, palavras)."""
+        resultado = np.zeros_like(palavras)
+        fim = primeira + len(palavras)
+        for codigo in codigos:
+            if codigo in self.densos:
+                resultado |= self.densos[codigo][primeira:fim]
+
+        escolhidos = np.zeros(len(self.valores), dtype=bool)
+        escolhidos[[c for c in codigos if c not in self.densos]] = True
+        if escolhidos.any():
+            codigos_faixa, deslocadas = self._esparsos_na_faixa(primeira, palavras)
+            bits = np.zeros(len(palavras) * 64, dtype=bool)
+            bits[deslocadas[escolhidos[codigos_faixa]]] = True
+            resultado |= _empacotar(bits)
+        return resultado & palavras
+
+    def contar(self, primeira, palavras):
+        """Linhas de cada código dentro do filtro (popcount da interseção), indexado pelo código."""
+        fim = primeira + len(palavras)
+        codigos_faixa, deslocadas = self._esparsos_na_faixa(primeira, palavras)
+        if len(codigos_faixa):
+            ligado = np.unpackbits(palavras.view(np.uint8), bitorder='little').view(bool)[deslocadas]
+            codigos_faixa = codigos_faixa[ligado]
+        contagem = np.bincount(codigos_faixa, minlength=len(self.valores)).astype(np.int64)
+        for codigo, bits in self.densos.items():
+            contagem[codigo] = _popcount(bits[primeira:fim] & palavras)
+        return contagem
+
+    def value_counts(self, primeira, palavras):
+        """Equivalente ao value_counts da coluna nas linhas do filtro (sem valores zerados)."""
+        serie = pd.Series(self.contar(primeira, palavras), index=self.valores)
+        return serie[serie > 0].sort_values(ascending=False, kind='stable')
+
+
+def construir_bitmaps(df, colunas):
+    return {coluna: IndiceBitmap.construir(df[coluna]) for coluna in colunas if coluna in df.columns}
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# ÍNDICE ESPARSO PARA COLUNAS MULTIVALORADAS
+# ==============================================================================
+# Colunas como tipos_testes_lista ("1, 2") guardam listas em texto. Em vez de
+# quebrar as strings a cada rerun, decodificamos uma vez no carregamento para
+# o formato CSR (linha -> códigos dos valores):
+#   indptr[i]:indptr[i+1]  = fatia de `codigos` com os valores da linha i
+#   valores[codigo]        = texto do valor
+# A contagem sobre as linhas filtradas vira um bincount vetorizado.
+
+# Separador de cada coluna (no formato do STRING_AGG do limpeza.py)
+COLUNAS_MULTIVALOR = {
+    'tipos_testes_lista': r'\s*[;,]\s*',
+    'fabricantes_teste_lista': r'\s*[;,]\s*',
+    'sintomas_texto': r'\s*[;,]\s*',
+    # ' / ' com espaços: nomes como 'SINOVAC/BUTANTAN' não podem ser quebrados
+    'fabricantes_vacina': r'\s+/\s+',
+}
+
+
+def _como_texto(serie):
+    # Colunas só com códigos numéricos chegam do CSV como float (1.0): volta para '1'
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype('Int64').astype('string')
+    return serie.astype('string')
+
+
+# Menores tipos que comportam as posições e os códigos (o índice fica em memória por processo)
+def _indptr(tamanhos):
+    indptr = np.zeros(len(tamanhos) + 1, dtype=np.int32 if tamanhos.sum() < 2 ** 31 else np.int64)
+    np.cumsum(tamanhos, out=indptr[1:])
+    return indptr
+
+
+def _tipo_codigo(n_valores):
+    return np.int16 if n_valores < 2 ** 15 else np.int32
+
+
+class IndiceMultivalor:
+    def __init__(self, indptr, codigos, valores):
+        self.indptr = indptr
+        self.codigos = codigos
+        self.valores = valores
+
+    @classmethod
+    def construir(cls, serie, separador):
+        n = len(serie)
+        partes = _como_texto(serie).reset_index(drop=True).dropna().str.split(separador, regex=True).explode()
+        partes = partes.str.strip()
+        partes = partes[partes.notna() & (partes != '')]
+
+        linhas = partes.index.to_numpy(dtype=np.int64)
+        codigos, valores = pd.factorize(partes.to_numpy())
+        return cls(_indptr(np.bincount(linhas, minlength=n)), codigos.astype(_tipo_codigo(len(valores))),
+                   np.asarray(valores, dtype=object))
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.codigos.nbytes + sum(len(v.encode()) for v in self.valores)
+
+    def _codigos_das_linhas(self, linhas):
+        if linhas is None:
+            return self.codigos
+        linhas = np.asarray(linhas)
+        if len(linhas) and linhas[-1] - linhas[0] + 1 == len(linhas):
+            # Intervalo contínuo (ex.: só filtro de período): fatia direta
+            return self.codigos[self.indptr[linhas[0]]:self.indptr[linhas[-1] + 1]]
+        return self._reunir(linhas)
+
+    def _reunir(self, linhas):
+        # Códigos das linhas indicadas, em qualquer ordem, concatenados
+        inicio = self.indptr[linhas]
+        tamanho = self.indptr[linhas + 1] - inicio
+        # Posição de cada entrada = início da sua linha + deslocamento dentro dela
+        deslocamento = np.arange(tamanho.sum()) - np.repeat(np.cumsum(tamanho) - tamanho, tamanho)
+        return self.codigos[np.repeat(inicio, tamanho) + deslocamento]
+
+    def entradas(self, linhas=None):
+        """(posição da linha em `linhas`, código) de cada valor das linhas indicadas."""
+        if linhas is None:
+            return np.repeat(np.arange(len(self)), np.diff(self.indptr)), self.codigos
+        linhas = np.asarray(linhas)
+        tamanhos = self.indptr[linhas + 1] - self.indptr[linhas]
+        return np.repeat(np.arange(len(linhas)), tamanhos), self._reunir(linhas)
+
+    def concatenar(self, outro):
+        """Índice com as linhas de self seguidas das de `outro` (códigos de `outro` remapeados)."""
+        valores = pd.Index(self.valores)
+        valores = valores.append(pd.Index(outro.valores).difference(valores, sort=False))
+        codigos_outro = valores.get_indexer(outro.valores)[outro.codigos]
+        codigos = np.concatenate([self.codigos, codigos_outro]).astype(_tipo_codigo(len(valores)))
+        tamanhos = np.concatenate([np.diff(self.indptr), np.diff(outro.indptr)])
+        return IndiceMultivalor(_indptr(tamanhos), codigos, np.asarray(valores, dtype=object))
+
+    def reordenar(self, ordem):
+        """Índice com as linhas na ordem dada (a linha i do novo é a linha ordem[i] deste)."""
+        ordem = np.asarray(ordem)
+        return IndiceMultivalor(_indptr(np.diff(self.indptr)[ordem]), self._reunir(ordem), self.valores)
+
+    def contar(self, linhas=None):
+        """Contagem de cada valor nas linhas indicadas (posições) -> array indexado pelo código."""
+        return np.bincount(self._codigos_das_linhas(linhas), minlength=len(self.valores))
+
+    def value_counts(self, linhas=None):
+        """Equivalente ao pd.Series(valores).value_counts() das linhas indicadas."""
+        contagem = self.contar(linhas)
+        serie = pd.Series(contagem, index=self.valores)
+        return serie[serie > 0].sort_values(ascending=False, kind='stable')
+
+
+def construir_indices(df):
+    return {
+        coluna: IndiceMultivalor.construir(df[coluna], separador)
+        for coluna, separador in COLUNAS_MULTIVALOR.items()
+        if coluna in df.columns
+    }
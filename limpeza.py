@@ -20,22 +20,13 @@ DB_CONFIG = {
 
 CONN_STR = f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
 
-try:
-    engine = create_engine(CONN_STR)
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-    print(">> Conexão com o Banco de Dados: OK")
-except Exception as e:
-    print(f"\n[ERRO CRÍTICO] Não foi possível conectar ao banco.")
-    print(f"Detalhe: {e}")
-    sys.exit()
-
-print("\n--- INICIANDO ETAPA 2: GERAÇÃO DE DATASET 'DASHBOARD & ML READY' ---")
-
 # ==============================================================================
 # 2. EXTRAÇÃO DOS DADOS (CORRIGIDO PARA SQLALCHEMY 2.0)
 # ==============================================================================
-print(">> 1. Executando Query SQL complexa...")
+# A query e as regras de negócio ficam no nível do módulo para poderem ser
+# importadas (ex.: benchmark_sql.py, pipeline_embarcado.py) sem disparar a exportação.
+# Os STRING_AGG(DISTINCT ...) têm ORDER BY explícito: as listas saem na mesma
+# ordem no PostgreSQL e no DuckDB.
 
 # Nota: O uso de : (dois pontos) é para parâmetros. O % é tratado como literal quando usamos text()
 query_exportacao = """
@@ -59,7 +50,7 @@ agg_vacinas AS (
         notificacao_id,
         COUNT(*) as total_doses,
         MAX(data_aplicacao) as data_ultima_dose,
-        STRING_AGG(DISTINCT laboratorio, ' / ') as fabricantes_vacina
+        STRING_AGG(DISTINCT laboratorio, ' / ' ORDER BY laboratorio) as fabricantes_vacina
     FROM vacina_aplicada
     GROUP BY notificacao_id
 ),
@@ -69,8 +60,8 @@ agg_testes AS (
     SELECT 
         notificacao_id,
         COUNT(*) as qtd_testes_realizados,
-        STRING_AGG(DISTINCT tipo_teste, ', ') as tipos_testes_lista,
-        STRING_AGG(DISTINCT fabricante_teste, ', ') as fabricantes_teste_lista,
+        STRING_AGG(DISTINCT tipo_teste, ', ' ORDER BY tipo_teste) as tipos_testes_lista,
+        STRING_AGG(DISTINCT fabricante_teste, ', ' ORDER BY fabricante_teste) as fabricantes_teste_lista,
         MAX(CASE WHEN resultado_teste ILIKE '%Positivo%' OR resultado_teste ILIKE '%Detectável%' THEN 1 ELSE 0 END) as houve_teste_positivo,
         MAX(data_coleta) as data_coleta_teste
     FROM teste_laboratorial
@@ -128,42 +119,9 @@ LEFT JOIN agg_testes t ON n.notificacao_id = t.notificacao_id
 WHERE n.excluido = FALSE;
 """
 
-try:
-    # --- CORREÇÃO AQUI: Usamos engine.connect() e text() ---
-    with engine.connect() as conn:
-        df_padronizado = pd.read_sql(text(query_exportacao), conn)
-    
-    if df_padronizado.empty:
-        print("\n" + "!"*50)
-        print("[ALERTA] O Dataset retornou VAZIO (0 linhas).")
-        print("!"*50)
-        sys.exit()
-        
-    print(f" -> Extração concluída. Registros encontrados: {len(df_padronizado)}")
-
-except Exception as e:
-    print(f"\n[ERRO SQL] Falha ao executar a consulta.")
-    print(f"Detalhe: {e}")
-    sys.exit()
-
 # ==============================================================================
 # 3. TRATAMENTO E FEATURE ENGINEERING (PYTHON)
 # ==============================================================================
-print(">> 2. Aplicando regras de negócio e Feature Engineering...")
-
-# 3.1 Tratamento de Outliers de Idade
-df_padronizado.loc[(df_padronizado['idade'] < 0) | (df_padronizado['idade'] > 120), 'idade'] = np.nan
-
-# 3.2 Criação de Faixa Etária
-bins = [0, 12, 19, 39, 59, 79, 120]
-labels = ['Criança (0-12)', 'Adolescente (13-19)', 'Jovem Adulto (20-39)', 'Adulto (40-59)', 'Idoso (60-79)', 'Super Idoso (80+)']
-df_padronizado['faixa_etaria'] = pd.cut(df_padronizado['idade'], bins=bins, labels=labels, right=True)
-
-# 3.3 Padronização de Ocupação
-df_padronizado['categoria_ocupacao'] = df_padronizado.apply(
-    lambda x: 'Profissional de Saúde' if x['is_profissional_saude'] == 'Sim' else 'Outros', axis=1
-)
-
 # 3.4 Target para Machine Learning
 def definir_target(status):
     if pd.isnull(status): return np.nan
@@ -171,14 +129,27 @@ def definir_target(status):
     if 'Confirmado' in status or 'Laboratorial' in status: return 1
     return 0
 
-df_padronizado['target_confirmado'] = df_padronizado['classificacao_final'].apply(definir_target)
+def aplicar_regras_negocio(df_padronizado):
+    # 3.1 Tratamento de Outliers de Idade
+    df_padronizado.loc[(df_padronizado['idade'] < 0) | (df_padronizado['idade'] > 120), 'idade'] = np.nan
+
+    # 3.2 Criação de Faixa Etária
+    bins = [0, 12, 19, 39, 59, 79, 120]
+    labels = ['Criança (0-12)', 'Adolescente (13-19)', 'Jovem Adulto (20-39)', 'Adulto (40-59)', 'Idoso (60-79)', 'Super Idoso (80+)']
+    df_padronizado['faixa_etaria'] = pd.cut(df_padronizado['idade'], bins=bins, labels=labels, right=True)
+
+    # 3.3 Padronização de Ocupação
+    df_padronizado['categoria_ocupacao'] = df_padronizado.apply(
+        lambda x: 'Profissional de Saúde' if x['is_profissional_saude'] == 'Sim' else 'Outros', axis=1
+    )
+
+    df_padronizado['target_confirmado'] = df_padronizado['classificacao_final'].apply(definir_target)
+    return df_padronizado
 
 # ==============================================================================
 # 4. EXPORTAÇÃO E AUDITORIA
 # ==============================================================================
 arquivo_saida = 'dataset_covid_dashboard_v2.csv'
-print(f">> 3. Salvando arquivo final: {arquivo_saida}")
-df_padronizado.to_csv(arquivo_saida, index=False, sep=';', encoding='utf-8-sig')
 
 # --- Função de Auditoria Rápida ---
 def auditar_dataset(df):
@@ -203,4 +174,46 @@ def auditar_dataset(df):
     else:
         print("6. Balanceamento do Target (ML): [Sem dados suficientes]")
 
-auditar_dataset(df_padronizado)
\ No newline at end of file
+def main():
+    try:
+        engine = create_engine(CONN_STR)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        print(">> Conexão com o Banco de Dados: OK")
+    except Exception as e:
+        print(f"\n[ERRO CRÍTICO] Não foi possível conectar ao banco.")
+        print(f"Detalhe: {e}")
+        sys.exit()
+
+    print("\n--- INICIANDO ETAPA 2: GERAÇÃO DE DATASET 'DASHBOARD & ML READY' ---")
+    print(">> 1. Executando Query SQL complexa...")
+
+    try:
+        # --- CORREÇÃO AQUI: Usamos engine.connect() e text() ---
+        with engine.connect() as conn:
+            df_padronizado = pd.read_sql(text(query_exportacao), conn)
+        
+        if df_padronizado.empty:
+            print("\n" + "!"*50)
+            print("[ALERTA] O Dataset retornou VAZIO (0 linhas).")
+            print("!"*50)
+            sys.exit()
+            
+        print(f" -> Extração concluída. Registros encontrados: {len(df_padronizado)}")
+
+    except Exception as e:
+        print(f"\n[ERRO SQL] Falha ao executar a consulta.")
+        print(f"Detalhe: {e}")
+        sys.exit()
+
+    print(">> 2. Aplicando regras de negócio e Feature Engineering...")
+    df_padronizado = aplicar_regras_negocio(df_padronizado)
+
+    print(f">> 3. Salvando arquivo final: {arquivo_saida}")
+    df_padronizado.to_csv(arquivo_saida, index=False, sep=';', encoding='utf-8-sig')
+
+    auditar_dataset(df_padronizado)
+
+
+if __name__ == '__main__':
+    main()
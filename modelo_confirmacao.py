@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# MODELO DE PROBABILIDADE DE CONFIRMAÇÃO (REGRESSÃO LOGÍSTICA)
+# ==============================================================================
+# Treino offline sobre o dataset exportado pelo limpeza.py (target_confirmado):
+#   python modelo_confirmacao.py --dataset df_padronizado_para_o_dash.csv
+# Grava um artefato JSON pequeno e versionado (coeficientes + métricas de
+# validação) que o app.py carrega uma vez por processo. O mesmo código de
+# atributos serve para uma linha (simulador) ou para todas as notificações
+# filtradas de uma vez (distribuição de risco): uma multiplicação matricial.
+#
+# O ajuste é feito com NumPy (IRLS / Newton-Raphson com regularização L2),
+# sem depender do scikit-learn.
+
+VERSAO_ARTEFATO = 1
+ARQUIVO_MODELO = 'modelo_confirmacao.json'
+
+# Colunas do dataset usadas pelo modelo
+COLUNAS = ['idade', 'flg_febre', 'flg_tosse', 'flg_dispneia', 'status_vacinal', 'is_profissional_saude']
+
+# Nome do atributo -> rótulo na tabela de importância
+ATRIBUTOS = {
+    'idade_decadas': 'Idade (por 10 anos)',
+    'febre': 'Febre',
+    'tosse': 'Tosse',
+    'dispneia': 'Dispneia',
+    'vacina_parcial': 'Vacinação Parcial',
+    'esquema_completo': 'Esquema Vacinal Completo',
+    'profissional_saude': 'Profissional Saúde',
+}
+
+
+def _numerica(serie):
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def matriz_atributos(df, media_idade):
+    """Matriz (n linhas x atributos) na ordem de ATRIBUTOS. Idade nula recebe a média do treino."""
+    idade = _numerica(df['idade'])
+    idade = np.where(np.isnan(idade), media_idade, idade)
+    flags = [np.nan_to_num(_numerica(df[c])) for c in ['flg_febre', 'flg_tosse', 'flg_dispneia']]
+    status = df['status_vacinal'].astype('string')
+    return np.column_stack([
+        idade / 10,
+        *flags,
+        (status == 'Parcial').to_numpy(dtype=float, na_value=0),
+        (status == 'Esquema Completo').to_numpy(dtype=float, na_value=0),
+        (df['is_profissional_saude'].astype('string') == 'Sim').to_numpy(dtype=float, na_value=0),
+    ])
+
+
+def _sigmoide(z):
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+
+def ajustar_logistica(X, y, l2=1.0, max_iter=50, tolerancia=1e-8):
+    """IRLS com penalidade L2 (o intercepto não é penalizado). Devolve (intercepto, coeficientes)."""
+    X1 = np.column_stack([np.ones(len(X)), X])
+    penalidade = np.full(X1.shape[1], l2)
+    penalidade[0] = 0
+    w = np.zeros(X1.shape[1])
+    for _ in range(max_iter):
+        p = _sigmoide(X1 @ w)
+        gradiente = X1.T @ (y - p) - penalidade * w
+        hessiana = (X1 * (p * (1 - p))[:, None]).T @ X1 + np.diag(penalidade)
+        passo = np.linalg.solve(hessiana, gradiente)
+        w += passo
+        if np.max(np.abs(passo)) < tolerancia:
+            break
+    return w[0], w[1:]
+
+
+def auc(y, p):
+    """Área sob a curva ROC pela estatística de Mann-Whitney (empates com posto médio)."""
+    positivos = int(y.sum())
+    negativos = len(y) - positivos
+    if positivos == 0 or negativos == 0:
+        return float('nan')
+    postos = pd.Series(p).rank().to_numpy()
+    return float((postos[y == 1].sum() - positivos * (positivos + 1) / 2) / (positivos * negativos))
+
+
+def log_loss(y, p):
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def treinar(df, l2=1.0, fracao_teste=0.2, semente=42):
+    """Ajusta o modelo nas linhas com target_confirmado e devolve o artefato (dict)."""
+    alvo = pd.to_numeric(df['target_confirmado'], errors='coerce')
+    df = df[alvo.notna()]
+    y = alvo[alvo.notna()].to_numpy(dtype=float)
+    if len(df) == 0:
+        raise ValueError("Nenhuma linha com target_confirmado para treinar o modelo")
+
+    media_idade = float(np.nanmean(_numerica(df['idade']))) if df['idade'].notna().any() else 0.0
+    X = matriz_atributos(df, media_idade)
+
+    # Validação em holdout; o modelo final é reajustado com todas as linhas
+    teste = np.random.default_rng(semente).random(len(df)) < fracao_teste
+    intercepto, coeficientes = ajustar_logistica(X[~teste], y[~teste], l2=l2)
+    p_teste = _sigmoide(intercepto + X[teste] @ coeficientes)
+    intercepto, coeficientes = ajustar_logistica(X, y, l2=l2)
+
+    return {
+        'versao': VERSAO_ARTEFATO,
+        'treinado_em': datetime.now().isoformat(timespec='seconds'),
+        'atributos': list(ATRIBUTOS),
+        'intercepto': float(intercepto),
+        'coeficientes': [float(c) for c in coeficientes],
+        'media_idade': media_idade,
+        'l2': l2,
+        'metricas': {
+            'linhas_treino': int(len(df)),
+            'linhas_teste': int(teste.sum()),
+            'taxa_confirmacao': float(y.mean()),
+            'auc_teste': auc(y[teste], p_teste),
+            'log_loss_teste': log_loss(y[teste], p_teste) if teste.any() else float('nan'),
+        },
+    }
+
+
+class ModeloConfirmacao:
+    def __init__(self, artefato):
+        if artefato.get('versao') != VERSAO_ARTEFATO or artefato.get('atributos') != list(ATRIBUTOS):
+            raise ValueError(
+                f"Artefato do modelo incompatível (versão {artefato.get('versao')}, esperada {VERSAO_ARTEFATO}). "
+                "Treine novamente com: python modelo_confirmacao.py"
+            )
+        self.artefato = artefato
+        self.intercepto = artefato['intercepto']
+        self.coeficientes = np.asarray(artefato['coeficientes'])
+        self.media_idade = artefato['media_idade']
+        self.metricas = artefato['metricas']
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_MODELO):
+        with open(caminho, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def salvar(self, caminho=ARQUIVO_MODELO):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.artefato, f, ensure_ascii=False, indent=2)
+
+    def probabilidades(self, df):
+        """Probabilidade de confirmação de cada linha do DataFrame (vetorizado)."""
+        return _sigmoide(self.intercepto + matriz_atributos(df, self.media_idade) @ self.coeficientes)
+
+    def probabilidade(self, idade, status_vacinal, febre, tosse, dispneia, profissional_saude):
+        """Probabilidade de um caso (entrada do simulador)."""
+        caso = pd.DataFrame({
+            'idade': [idade],
+            'flg_febre': [int(febre)],
+            'flg_tosse': [int(tosse)],
+            'flg_dispneia': [int(dispneia)],
+            'status_vacinal': [status_vacinal],
+            'is_profissional_saude': ['Sim' if profissional_saude else 'Não'],
+        })
+        return float(self.probabilidades(caso)[0])
+
+    def importancia(self):
+        """Coeficientes como razão de chances, do maior efeito para o menor."""
+        fatores = pd.DataFrame({
+            'Fator': list(ATRIBUTOS.values()),
+            'Coeficiente': self.coeficientes.round(3),
+            'Razão de Chances': np.exp(self.coeficientes).round(2),
+        })
+        fatores['Direção'] = np.where(self.coeficientes > 0, 'Aumenta risco', 'Reduz risco')
+        return fatores.reindex(fatores['Coeficiente'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o modelo de probabilidade de confirmação do Dashboard.")
+    parser.add_argument('--dataset', default='df_padronizado_para_o_dash.csv',
+                        help="CSV exportado pelo limpeza.py (separador ';')")
+    parser.add_argument('--saida', default=ARQUIVO_MODELO, help="Arquivo JSON do modelo")
+    parser.add_argument('--l2', type=float, default=1.0, help="Força da regularização L2")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dataset):
+        print(f"[ERRO] Dataset {args.dataset} não encontrado. Rode o limpeza.py primeiro.")
+        sys.exit(1)
+
+    print(f">> 1. Lendo {args.dataset}...")
+    df = pd.read_csv(args.dataset, sep=';', encoding='utf-8', usecols=COLUNAS + ['target_confirmado'])
+
+    print(">> 2. Treinando regressão logística...")
+    modelo = ModeloConfirmacao(treinar(df, l2=args.l2))
+    metricas = modelo.metricas
+    print(f"   -> {metricas['linhas_treino']} linhas ({metricas['linhas_teste']} no holdout)")
+    print(f"   -> AUC (holdout): {metricas['auc_teste']:.3f} | log loss: {metricas['log_loss_teste']:.4f}")
+    print(modelo.importancia().to_string(index=False))
+
+    modelo.salvar(args.saida)
+    print(f">> 3. Modelo salvo em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
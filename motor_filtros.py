@@ -0,0 +1,228 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from compactacao import concatenar, uso_memoria
+from coocorrencia import CoocorrenciaSintomas
+from indice_bitmap import construir_bitmaps, intervalo, posicoes
+from indice_multivalor import construir_indices
+
+# ==============================================================================
+# MOTOR DE FILTROS DO DASHBOARD
+# ==============================================================================
+# Chaves pré-calculadas uma única vez no carregamento:
+#   * o dataset fica ORDENADO por data_notificacao, e a data vira um inteiro
+#     (dias desde 1970-01-01, int32). O filtro de período é então uma busca binária
+#     (searchsorted) que devolve um intervalo contínuo de linhas.
+#   * municipio_nome vira um código inteiro (categórico), e cada município e
+#     cada valor das dimensões de COLUNAS_BITMAP ganha um bitset
+#     (indice_bitmap.py). O filtro de municípios é o OR dos bitsets escolhidos
+#     na faixa de datas, e as contagens por valor são popcounts.
+# O resultado de cada estado de filtro fica em cache (LRU), então trocar de aba
+# ou mexer em widgets que não alteram o filtro não refiltra nada.
+# As colunas multivaloradas (listas em texto) também são decodificadas aqui,
+# em índices CSR (indice_multivalor.py) alinhados às linhas de self.df; depois
+# disso as strings originais saem do DataFrame.
+# A correlação sintomas x confirmação usa contagens por município x mês
+# (coocorrencia.py), montadas no primeiro uso.
+
+# Estado dos filtros da sidebar. municipios é uma tupla ordenada; inicio/fim são
+# datetime.date ou None (sem filtro de período). Hashable: serve de chave de cache.
+Filtro = namedtuple('Filtro', ['municipios', 'inicio', 'fim'])
+
+# Dimensões com índice bitmap (filtro de municípios e contagens das seções)
+COLUNAS_BITMAP = ['municipio_nome', 'status_vacinal', 'resultado_teste_agregado', 'faixa_etaria']
+
+
+def _dia_ordinal(data):
+    # Mesmo tipo de self.dias: com int64 o searchsorted converteria o array inteiro a cada busca
+    return np.datetime64(data, 'D').astype(np.int32)
+
+
+def _ordem_por_data(datas):
+    """Permutação estável que ordena por data (NaT no final), ou None se já está ordenado."""
+    dias = datas.to_numpy().astype('datetime64[D]').astype(np.int64)
+    dias = np.where(datas.isna().to_numpy(), np.iinfo(np.int64).max, dias)
+    if len(dias) < 2 or (dias[1:] >= dias[:-1]).all():
+        return None
+    return np.argsort(dias, kind='stable')
+
+
+class MotorFiltros:
+    def __init__(self, df, tamanho_cache=32, multivalor=None):
+        # NaT vão para o final: as linhas com data formam o prefixo ordenado
+        ordem = _ordem_por_data(df['data_notificacao'])
+        self.df = (df if ordem is None else df.take(ordem)).reset_index(drop=True)
+        if multivalor is None:
+            self.multivalor = construir_indices(self.df)
+            self.df = self.df.drop(columns=list(self.multivalor))
+        else:
+            # Índices já construídos (anexar), alinhados às linhas de df antes da ordenação
+            self.multivalor = multivalor if ordem is None else {c: i.reordenar(ordem) for c, i in multivalor.items()}
+
+        datas = self.df['data_notificacao']
+        self.n_com_data = int(datas.notna().sum())
+        self.dias = datas.iloc[:self.n_com_data].to_numpy().astype('datetime64[D]').astype(np.int32)
+
+        categorias = pd.Categorical(self.df['municipio_nome'])
+        self.municipios = list(categorias.categories)
+        self._indice_municipio = {nome: i for i, nome in enumerate(self.municipios)}
+        # -1 (município nulo) aponta para a última posição da tabela de consulta, sempre False
+        self.codigos_municipio = categorias.codes
+        # Bitsets sobre as linhas já ordenadas (refeitos a cada motor, inclusive no anexar)
+        self.bitmaps = construir_bitmaps(self.df, COLUNAS_BITMAP)
+
+        self._cache = OrderedDict()
+        self._tamanho_cache = tamanho_cache
+        self._lock = threading.Lock()
+        self._coocorrencia = None
+        self._lock_coocorrencia = threading.Lock()
+
+    def anexar(self, novos):
+        """Novo motor com as linhas de `novos` (compactadas) somadas às atuais.
+
+        Só as linhas novas são decodificadas (índices CSR); as atuais são reaproveitadas.
+        O motor atual não é alterado e continua servindo as sessões até a troca.
+        """
+        novos = novos.assign(**{c: None for c in self.multivalor if c not in novos.columns})
+        indices_novos = construir_indices(novos)
+        df = concatenar(self.df, novos.drop(columns=list(indices_novos)))
+        multivalor = {c: i.concatenar(indices_novos[c]) for c, i in self.multivalor.items()}
+        return MotorFiltros(df, self._tamanho_cache, multivalor=multivalor)
+
+    @property
+    def tem_datas(self):
+        return self.n_com_data > 0
+
+    @property
+    def data_min(self):
+        return pd.Timestamp(self.dias[0], unit='D').date()
+
+    @property
+    def data_max(self):
+        return pd.Timestamp(self.dias[-1], unit='D').date()
+
+    def uso_memoria(self):
+        """MB por coluna do dataset e por índice multivalorado, para o relatório da sidebar."""
+        memoria = uso_memoria(self.df)
+        for coluna, indice in self.multivalor.items():
+            memoria[f"{coluna} (índice)"] = indice.nbytes / 1024 ** 2
+        for coluna, indice in self.bitmaps.items():
+            memoria[f"{coluna} (bitmap)"] = indice.nbytes / 1024 ** 2
+        if self._coocorrencia is not None:
+            memoria["correlação de sintomas (contagens)"] = self._coocorrencia.nbytes / 1024 ** 2
+        return memoria.sort_values(ascending=False)
+
+    def criar_filtro(self, municipios, inicio=None, fim=None):
+        return Filtro(tuple(sorted(municipios)), inicio, fim)
+
+    def _intervalo_datas(self, filtro):
+        if filtro.inicio is None or filtro.fim is None:
+            return 0, len(self.df)
+        a = int(np.searchsorted(self.dias, _dia_ordinal(filtro.inicio), side='left'))
+        b = int(np.searchsorted(self.dias, _dia_ordinal(filtro.fim), side='right'))
+        return a, b
+
+    def _tabela_municipios(self, filtro):
+        # Tabela de consulta por código; -1 (município nulo) cai na última posição, sempre False
+        tabela = np.zeros(len(self.municipios) + 1, dtype=bool)
+        codigos = [self._indice_municipio[m] for m in filtro.municipios if m in self._indice_municipio]
+        tabela[codigos] = True
+        return tabela
+
+    def _calcular_bits(self, filtro):
+        # Faixa de datas como bitset; com municípios, AND com o OR dos bitsets deles
+        primeira, palavras = intervalo(*self._intervalo_datas(filtro))
+        if filtro.municipios:
+            codigos = [self._indice_municipio[m] for m in filtro.municipios if m in self._indice_municipio]
+            palavras = self.bitmaps['municipio_nome'].ou(codigos, primeira, palavras)
+        return primeira, palavras
+
+    def _calcular_linhas(self, filtro, bits):
+        if not filtro.municipios:
+            return np.arange(*self._intervalo_datas(filtro))
+        return posicoes(*bits)
+
+    def _entrada(self, filtro):
+        with self._lock:
+            entrada = self._cache.get(filtro)
+            if entrada is not None:
+                self._cache.move_to_end(filtro)
+                return entrada
+
+        bits = self._calcular_bits(filtro)
+        entrada = {'bits': bits, 'linhas': self._calcular_linhas(filtro, bits)}
+        with self._lock:
+            self._cache[filtro] = entrada
+            while len(self._cache) > self._tamanho_cache:
+                self._cache.popitem(last=False)
+        return entrada
+
+    def linhas(self, filtro):
+        """Posições (em self.df) das linhas que passam no filtro."""
+        return self._entrada(filtro)['linhas']
+
+    def contar_multivalor(self, coluna, filtro, top=None):
+        """value_counts dos valores de uma coluna multivalorada nas linhas filtradas."""
+        contagem = self.multivalor[coluna].value_counts(self.linhas(filtro))
+        return contagem.head(top) if top else contagem
+
+    def contar_categoria(self, coluna, filtro, top=None):
+        """value_counts de uma coluna de COLUNAS_BITMAP nas linhas filtradas (popcount, sem filtrar o df)."""
+        contagem = self.bitmaps[coluna].value_counts(*self._entrada(filtro)['bits'])
+        return contagem.head(top) if top else contagem
+
+    def _obter_coocorrencia(self):
+        with self._lock_coocorrencia:
+            if self._coocorrencia is None:
+                self._coocorrencia = CoocorrenciaSintomas(
+                    self.multivalor['sintomas_texto'], self.df['target_confirmado'], self.codigos_municipio, self.df['mes']
+                )
+            return self._coocorrencia
+
+    @property
+    def total_sintomas(self):
+        """Sintomas distintos do dataset (o heatmap mostra no máximo MAX_SINTOMAS deles)."""
+        return self._obter_coocorrencia().total_sintomas
+
+    def correlacao_sintomas(self, filtro):
+        """Correlação entre os sintomas de sintomas_texto e a confirmação nas linhas filtradas."""
+        coocorrencia = self._obter_coocorrencia()
+
+        grupos = np.ones(len(coocorrencia.grupo_mes), dtype=bool)
+        if filtro.municipios:
+            grupos &= self._tabela_municipios(filtro)[coocorrencia.grupo_municipio]
+
+        pontas = None
+        if filtro.inicio is not None and filtro.fim is not None:
+            # Meses inteiros dentro do período vêm das contagens por grupo...
+            mes_inicio = np.datetime64(filtro.inicio, 'M')
+            mes_fim = np.datetime64(filtro.fim, 'M')
+            primeiro = mes_inicio if np.datetime64(filtro.inicio, 'D') == mes_inicio.astype('datetime64[D]') else mes_inicio + 1
+            ultimo = mes_fim if np.datetime64(filtro.fim, 'D') + 1 == (mes_fim + 1).astype('datetime64[D]') else mes_fim - 1
+            grupos &= (coocorrencia.grupo_mes >= primeiro.astype(np.int64)) & (coocorrencia.grupo_mes <= ultimo.astype(np.int64))
+
+            # ...e os dias soltos das pontas, direto das linhas (o dataset está ordenado por data)
+            a, b = self._intervalo_datas(filtro)
+            if primeiro > ultimo:
+                pontas = np.arange(a, b)
+            else:
+                corte_inicio = int(np.searchsorted(self.dias, _dia_ordinal(primeiro)))
+                corte_fim = int(np.searchsorted(self.dias, _dia_ordinal(ultimo + 1)))
+                pontas = np.concatenate([np.arange(a, max(a, corte_inicio)), np.arange(min(b, corte_fim), b)])
+            if filtro.municipios:
+                pontas = pontas[self._tabela_municipios(filtro)[self.codigos_municipio[pontas]]]
+
+        return coocorrencia.correlacao(coocorrencia.matriz(grupos, pontas))
+
+    def filtrar(self, filtro):
+        """DataFrame filtrado (compartilhado entre sessões: não modificar)."""
+        entrada = self._entrada(filtro)
+        if 'df' not in entrada:
+            linhas = entrada['linhas']
+            contiguo = len(linhas) == 0 or linhas[-1] - linhas[0] + 1 == len(linhas)
+            # Intervalo contínuo (só filtro de período): fatia sem cópia de índice
+            entrada['df'] = self.df.iloc[linhas[0]:linhas[-1] + 1] if contiguo and len(linhas) else self.df.take(linhas)
+        return entrada['df']
@@ -0,0 +1,141 @@
+import argparse
+import json
+import platform
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import plotly
+import streamlit
+
+# ==============================================================================
+# PERFILAMENTO DO RERUN DO DASHBOARD
+# ==============================================================================
+# Ativado com ?perfil=1 na URL ou DASHBOARD_PERFIL=1. Mede cada etapa do rerun
+# (carga, filtros, agregação da seção, montagem e serialização de cada gráfico)
+# com o número de linhas processadas, mostra a quebra na sidebar e exporta um
+# JSON para comparar versões:
+#   python perfilamento.py perfil_antes.json perfil_depois.json
+# Desativado, etapa() e marcar() não registram nada.
+
+
+class Perfilador:
+    def __init__(self, ativo=False, **contexto):
+        self.ativo = ativo
+        self.contexto = contexto
+        self.etapas = []
+        self._pilha = []
+        self._marca = None
+        self._inicio = time.perf_counter()
+        self.total_ms = None
+
+    def _abrir(self, nome, info):
+        pai = self._pilha[-1] if self._pilha else None
+        registro = {
+            'id': len(self.etapas),
+            'pai': pai['id'] if pai else None,
+            'nivel': len(self._pilha),
+            'nome': nome,
+            'caminho': f"{pai['caminho']} / {nome}" if pai else nome,
+            'ms': None,
+            **info,
+        }
+        registro['_inicio'] = time.perf_counter()
+        self.etapas.append(registro)
+        self._pilha.append(registro)
+        return registro
+
+    def _fechar(self, registro):
+        registro['ms'] = (time.perf_counter() - registro.pop('_inicio')) * 1000
+        # Fecha também etapas internas deixadas abertas (ex.: st.stop() no meio)
+        while self._pilha:
+            if self._pilha.pop() is registro:
+                break
+
+    @contextmanager
+    def etapa(self, nome, **info):
+        """Mede o bloco. O dict devolvido aceita dados extras (ex.: etapa['linhas'] = n)."""
+        if not self.ativo:
+            yield info
+            return
+        registro = self._abrir(nome, info)
+        try:
+            yield registro
+        finally:
+            self._fechar(registro)
+
+    def marcar(self, nome, **info):
+        """Encerra a etapa de primeiro nível atual e começa outra (sem indentar o script)."""
+        if not self.ativo:
+            return info
+        if self._marca is not None:
+            self._fechar(self._marca)
+        self._marca = self._abrir(nome, info)
+        return self._marca
+
+    def encerrar(self):
+        if self._marca is not None:
+            self._fechar(self._marca)
+            self._marca = None
+        self.total_ms = (time.perf_counter() - self._inicio) * 1000
+
+    def tabela(self):
+        """Etapas na ordem de execução, indentadas pelo aninhamento, com % do rerun."""
+        total = self.total_ms or sum(e['ms'] or 0 for e in self.etapas if e['nivel'] == 0)
+        return pd.DataFrame({
+            'Etapa': ['· ' * e['nivel'] + e['nome'] for e in self.etapas],
+            'ms': [round(e['ms'] or 0, 1) for e in self.etapas],
+            '% rerun': [round((e['ms'] or 0) / total * 100, 1) if total else 0 for e in self.etapas],
+            'Linhas': [e.get('linhas') for e in self.etapas],
+            'Cache': [e.get('cache') for e in self.etapas],
+        })
+
+    def relatorio(self):
+        """Dicionário serializável em JSON (para exportar e comparar entre versões)."""
+        return {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'contexto': self.contexto,
+            'versoes': {
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'plotly': plotly.__version__,
+                'streamlit': streamlit.__version__,
+            },
+            'total_ms': self.total_ms,
+            'etapas': [{k: v for k, v in e.items() if not k.startswith('_')} for e in self.etapas],
+        }
+
+
+def comparar(antes, depois):
+    """Tempo de cada etapa (pelo caminho) em dois relatórios exportados."""
+    def por_caminho(relatorio):
+        etapas = pd.DataFrame(relatorio['etapas'])
+        if etapas.empty:
+            return pd.Series(dtype=float)
+        return etapas.groupby('caminho', sort=False)['ms'].sum()
+
+    tabela = pd.DataFrame({'ms_antes': por_caminho(antes), 'ms_depois': por_caminho(depois)})
+    tabela.loc['TOTAL DO RERUN'] = [antes.get('total_ms'), depois.get('total_ms')]
+    tabela['variacao_%'] = (tabela['ms_depois'] / tabela['ms_antes'] - 1) * 100
+    return tabela.round(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois perfis exportados pelo Dashboard.")
+    parser.add_argument('antes', help="JSON do perfil de referência")
+    parser.add_argument('depois', help="JSON do perfil novo")
+    args = parser.parse_args()
+
+    with open(args.antes, encoding='utf-8') as f:
+        antes = json.load(f)
+    with open(args.depois, encoding='utf-8') as f:
+        depois = json.load(f)
+
+    print(f">> Antes:  {antes['gerado_em']} {antes['contexto']}")
+    print(f">> Depois: {depois['gerado_em']} {depois['contexto']}")
+    print(comparar(antes, depois).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import date
+
+from insercao import CSV_FILE, ler_csv, montar_tabelas
+from limpeza import aplicar_regras_negocio, arquivo_saida, auditar_dataset, query_exportacao
+
+try:
+    import duckdb
+except ImportError:  # dependência opcional
+    duckdb = None
+
+# ==============================================================================
+# PIPELINE EMBARCADO (SEM POSTGRESQL)
+# ==============================================================================
+# insercao.py -> calculos.sql/views.sql -> limpeza.py num arquivo DuckDB local,
+# sem servidor (análises rápidas, CI, uso offline):
+#   * Schema: o mesmo do banco.sql (mais a tabela indicadores_regionais do
+#     calculos.sql), traduzido na hora: SERIAL vira sequência + DEFAULT nextval,
+#     e ON DELETE CASCADE sai das FKs (o DuckDB não aceita). Os índices são
+#     criados depois da carga.
+#   * Carga: a limpeza é a do insercao.py (montar_tabelas); cada tabela entra
+#     com um INSERT ... SELECT sobre o DataFrame, que o DuckDB lê direto da
+#     memória, em vez dos INSERTs multi-valores do to_sql.
+#   * Indicadores: fx_calcular_taxa_positividade (PL/pgSQL, quatro consultas por
+#     município) vira uma consulta agrupada por município (SQL_INDICADORES).
+#   * Exportação: views.sql roda sem alterações; a query_exportacao e as regras
+#     de negócio são as do limpeza.py, e o CSV sai no mesmo formato.
+# Triggers (auditoria.sql, casos_diarios.sql) e views materializadas não
+# existem no DuckDB e ficam de fora.
+#
+#   python pipeline_embarcado.py --csv sus.csv --banco datasus.duckdb
+#   python pipeline_embarcado.py --sem-carga --inicio 2021-01-01 --fim 2021-01-31
+#
+# ATENÇÃO: sem --sem-carga o arquivo --banco é recriado.
+
+BANCO_PADRAO = 'datasus.duckdb'
+
+# Mesmas métricas e arredondamentos (tipos de indicadores_regionais) da função
+# do calculos.sql, para todos os municípios com notificação no período de uma vez
+SQL_INDICADORES = """
+INSERT INTO indicadores_regionais (
+    municipio_ibge, periodo_inicio, periodo_fim,
+    taxa_positividade, tempo_medio_sintomas_teste, perc_prof_saude_infectados, media_doses_vacina
+)
+WITH periodo AS (
+    SELECT notificacao_id, municipio_notificacao_ibge AS municipio_ibge, excluido
+    FROM notificacao
+    WHERE data_notificacao BETWEEN $inicio AND $fim
+),
+testes AS (
+    SELECT
+        p.municipio_ibge,
+        COUNT(*) FILTER (WHERE p.excluido = FALSE) AS total_testes,
+        COUNT(*) FILTER (WHERE p.excluido = FALSE AND t.resultado_teste = '1') AS total_positivos, -- Código 1 = Positivo
+        AVG(t.data_coleta - c.data_inicio_sintomas) FILTER (WHERE t.data_coleta >= c.data_inicio_sintomas) AS tempo_medio
+    FROM periodo p
+    JOIN teste_laboratorial t ON t.notificacao_id = p.notificacao_id
+    LEFT JOIN dados_clinicos c ON c.notificacao_id = p.notificacao_id
+    GROUP BY p.municipio_ibge
+),
+confirmados AS (
+    SELECT
+        p.municipio_ibge,
+        COUNT(*) AS total_confirmados,
+        COUNT(*) FILTER (WHERE d.is_profissional_saude ILIKE 'Sim') AS total_saude_confirmados
+    FROM periodo p
+    JOIN dados_clinicos c ON c.notificacao_id = p.notificacao_id
+    JOIN dados_demograficos d ON d.notificacao_id = p.notificacao_id
+    WHERE c.classificacao_final ILIKE '%Confirmado%' OR c.classificacao_final ILIKE '%Laboratorial%'
+    GROUP BY p.municipio_ibge
+),
+doses AS (
+    SELECT municipio_ibge, AVG(qtd_doses) AS media_doses
+    FROM (
+        SELECT p.municipio_ibge, p.notificacao_id, COUNT(v.vacina_id) AS qtd_doses
+        FROM periodo p
+        LEFT JOIN vacina_aplicada v ON v.notificacao_id = p.notificacao_id
+        GROUP BY p.municipio_ibge, p.notificacao_id
+    ) subquery
+    GROUP BY municipio_ibge
+)
+SELECT
+    m.municipio_ibge, $inicio, $fim,
+    CASE WHEN t.total_testes > 0 THEN t.total_positivos * 100.0 / t.total_testes ELSE 0 END::DECIMAL(5,2),
+    COALESCE(t.tempo_medio, 0)::DECIMAL(5,1),
+    CASE WHEN c.total_confirmados > 0 THEN c.total_saude_confirmados * 100.0 / c.total_confirmados ELSE 0 END::DECIMAL(5,2),
+    COALESCE(d.media_doses, 0)::DECIMAL(4,2)
+FROM (SELECT DISTINCT municipio_ibge FROM periodo) m
+LEFT JOIN testes t ON t.municipio_ibge = m.municipio_ibge
+LEFT JOIN confirmados c ON c.municipio_ibge = m.municipio_ibge
+LEFT JOIN doses d ON d.municipio_ibge = m.municipio_ibge
+ON CONFLICT (municipio_ibge, periodo_inicio, periodo_fim)
+DO UPDATE SET
+    taxa_positividade = EXCLUDED.taxa_positividade,
+    tempo_medio_sintomas_teste = EXCLUDED.tempo_medio_sintomas_teste,
+    perc_prof_saude_infectados = EXCLUDED.perc_prof_saude_infectados,
+    media_doses_vacina = EXCLUDED.media_doses_vacina,
+    data_processamento = now()
+"""
+
+
+def traduzir_schema(sql):
+    """DDL do PostgreSQL -> (tabelas, índices) no dialeto do DuckDB."""
+    sql = re.sub(r'\s+ON DELETE CASCADE', '', sql)
+
+    # SERIAL: sequência com o nome que o Postgres daria (tabela_coluna_seq)
+    sequencias = []
+    def serial(m):
+        nome_seq = f"{m.group(1)}_{m.group(3)}_seq"
+        sequencias.append(f"CREATE SEQUENCE IF NOT EXISTS {nome_seq};")
+        return f"CREATE TABLE IF NOT EXISTS {m.group(1)} ({m.group(2)}{m.group(3)} INTEGER DEFAULT nextval('{nome_seq}')"
+    sql = re.sub(r'CREATE TABLE IF NOT EXISTS (\w+) \((\s*)(\w+) SERIAL', serial, sql)
+
+    indices = re.findall(r'CREATE INDEX [^;]*;', sql)
+    for indice in indices:
+        sql = sql.replace(indice, '')
+    return '\n'.join(sequencias) + '\n' + sql, indices
+
+
+def criar_schema(con):
+    """Cria as tabelas do banco.sql e a indicadores_regionais; devolve os índices (para depois da carga)."""
+    with open('banco.sql', encoding='utf-8') as f:
+        banco = f.read()
+    with open('calculos.sql', encoding='utf-8') as f:
+        # Só a tabela: a função PL/pgSQL é substituída por SQL_INDICADORES
+        calculos = f.read().split('CREATE OR REPLACE FUNCTION')[0]
+
+    tabelas, indices = traduzir_schema(banco + '\n' + calculos)
+    con.execute(tabelas)
+    return indices
+
+
+def carregar_tabelas(con, tabelas):
+    """Carga em massa: INSERT ... SELECT direto dos DataFrames do montar_tabelas."""
+    for tabela, df in tabelas.items():
+        con.register('origem', df)
+        if tabela == 'notificacao_sintoma':
+            # sintoma_id vem da sequência, na carga da tabela sintoma
+            con.execute("""
+                INSERT INTO notificacao_sintoma (notificacao_id, sintoma_id)
+                SELECT DISTINCT o.notificacao_id, s.sintoma_id
+                FROM origem o JOIN sintoma s ON s.nome = o.nome
+            """)
+        else:
+            colunas = ', '.join(df.columns)
+            con.execute(f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM origem")
+        con.unregister('origem')
+        print(f"   -> {tabela}: {len(df)} linhas")
+
+
+def calcular_indicadores(con, inicio, fim):
+    con.execute(SQL_INDICADORES, {'inicio': inicio, 'fim': fim})
+    return con.execute(
+        "SELECT COUNT(*) FROM indicadores_regionais WHERE periodo_inicio = ? AND periodo_fim = ?", [inicio, fim]
+    ).fetchone()[0]
+
+
+def exportar_dataset(con):
+    # EXTRACT devolve NUMERIC no Postgres (float no read_sql) e BIGINT no DuckDB:
+    # DOUBLE para o CSV sair igual ao do limpeza.py. Ordenado pela notificação
+    # para sair igual entre execuções.
+    return con.execute(f"""
+        SELECT * REPLACE (semana_epidemiologica::DOUBLE AS semana_epidemiologica,
+                          mes_notificacao::DOUBLE AS mes_notificacao)
+        FROM ({query_exportacao.strip().rstrip(';')})
+        ORDER BY notificacao_id
+    """).df()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline completo (carga, indicadores, exportação) num arquivo DuckDB, sem PostgreSQL.")
+    parser.add_argument('--csv', default=CSV_FILE, help="CSV bruto do e-SUS")
+    parser.add_argument('--banco', default=BANCO_PADRAO, help="Arquivo DuckDB (recriado, salvo com --sem-carga)")
+    parser.add_argument('--saida', default=arquivo_saida, help="CSV do dataset do Dashboard")
+    parser.add_argument('--inicio', type=date.fromisoformat, help="Início do período dos indicadores (padrão: primeira notificação)")
+    parser.add_argument('--fim', type=date.fromisoformat, help="Fim do período dos indicadores (padrão: última notificação)")
+    parser.add_argument('--sem-carga', action='store_true', help="Reaproveita os dados já carregados no arquivo --banco")
+    parser.add_argument('--threads', type=int, help="Threads do DuckDB (padrão: todos os núcleos)")
+    args = parser.parse_args()
+
+    if duckdb is None:
+        print("[ERRO] O pipeline embarcado requer o pacote duckdb (pip install duckdb).")
+        sys.exit(1)
+    if args.sem_carga and not os.path.exists(args.banco):
+        print(f"[ERRO] {args.banco} não existe: rode uma vez sem --sem-carga.")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    if not args.sem_carga:
+        tabelas = montar_tabelas(ler_csv(args.csv))
+        if os.path.exists(args.banco):
+            os.remove(args.banco)
+
+    con = duckdb.connect(args.banco, config={'threads': args.threads} if args.threads else {})
+    try:
+        if not args.sem_carga:
+            print(f">> 9. Criando schema e carregando {args.banco}...")
+            indices = criar_schema(con)
+            carregar_tabelas(con, tabelas)
+            del tabelas
+            for indice in indices:
+                con.execute(indice)
+            with open('views.sql', encoding='utf-8') as f:
+                con.execute(f.read())
+
+        inicio, fim = con.execute("SELECT MIN(data_notificacao), MAX(data_notificacao) FROM notificacao").fetchone()
+        inicio, fim = args.inicio or inicio, args.fim or fim
+        if inicio is None or fim is None:
+            print("\n[ALERTA] Nenhuma notificação com data: indicadores não calculados.")
+        else:
+            print(f">> 10. Calculando indicadores regionais ({inicio} a {fim})...")
+            print(f"   -> {calcular_indicadores(con, inicio, fim)} municípios em indicadores_regionais")
+
+        print(">> 11. Executando a query de exportação...")
+        df_padronizado = exportar_dataset(con)
+    finally:
+        con.close()
+
+    if df_padronizado.empty:
+        print("\n[ALERTA] O Dataset retornou VAZIO (0 linhas).")
+        sys.exit(1)
+    print(f" -> Extração concluída. Registros encontrados: {len(df_padronizado)}")
+
+    print(">> 12. Aplicando regras de negócio e Feature Engineering...")
+    df_padronizado = aplicar_regras_negocio(df_padronizado)
+
+    print(f">> 13. Salvando arquivo final: {args.saida}")
+    df_padronizado.to_csv(args.saida, index=False, sep=';', encoding='utf-8-sig')
+
+    auditar_dataset(df_padronizado)
+    print(f"\n>> Pipeline embarcado concluído em {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
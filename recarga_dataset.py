@@ -0,0 +1,203 @@
+import glob
+import hashlib
+import io
+import os
+import threading
+import time
+
+import pandas as pd
+
+from compactacao import compactar
+from motor_filtros import MotorFiltros
+
+# ==============================================================================
+# RECARGA AUTOMÁTICA DO DATASET DO DASHBOARD
+# ==============================================================================
+# Uma thread em segundo plano verifica periodicamente o CSV exportado e as
+# partições ao lado dele (df_padronizado_para_o_dash_*.csv, ou o padrão em
+# DASHBOARD_PARTICOES):
+#   * arquivo que só cresceu (exportação incremental) ou partição nova: só os
+#     bytes novos são lidos e anexados ao motor (MotorFiltros.anexar). "Só
+#     cresceu" = o trecho já lido continua idêntico (hash BLAKE2 de todo o
+#     prefixo, não só do final: o limpeza.py reescreve o arquivo inteiro, e uma
+#     correção do mesmo tamanho em linhas antigas não pode passar por anexação);
+#   * qualquer outra mudança (arquivo reescrito, partição removida): recarga
+#     completa, também em segundo plano.
+# O motor novo substitui o antigo de uma vez; as sessões em andamento terminam
+# com o motor que já tinham. A versão dos dados entra nas chaves de cache do
+# app.py, então nenhum resultado antigo é reaproveitado depois da troca.
+
+# Tamanho dos blocos lidos para conferir o hash do trecho já carregado
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def preparar(df):
+    """Conversão de datas + compactação (compactacao.py). Devolve (df, relatório)."""
+    for col in ['data_notificacao', 'data_inicio_sintomas']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return compactar(df)
+
+
+def _ler_csv(cabecalho, conteudo):
+    return pd.read_csv(io.BytesIO(cabecalho + conteudo), sep=';', encoding='utf-8')
+
+
+class ArquivoMonitorado:
+    """Quanto de um CSV já foi carregado (até a última linha completa)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.cabecalho = b''
+        self.lido = 0
+        self.mtime = None
+        # Hash dos bytes [0, lido), atualizado a cada leitura
+        self._hash = hashlib.blake2b()
+        self.resumo = self._hash.digest()
+
+    def ler_novas_linhas(self):
+        """Bytes das linhas completas a partir de self.lido (sem o cabeçalho) e avança o ponteiro."""
+        with open(self.caminho, 'rb') as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime_ns
+            if self.lido == 0:
+                self.cabecalho = f.readline()
+                if not self.cabecalho.endswith(b'\n'):
+                    # Cabeçalho ainda incompleto (arquivo sendo criado)
+                    self.cabecalho = b''
+                    return b''
+                self.lido = len(self.cabecalho)
+                self._hash.update(self.cabecalho)
+            f.seek(self.lido)
+            conteudo = f.read()
+        # Uma linha final ainda sendo escrita fica para a próxima verificação
+        conteudo = conteudo[:conteudo.rfind(b'\n') + 1]
+        self.lido += len(conteudo)
+        self._hash.update(conteudo)
+        self.resumo = self._hash.digest()
+        return conteudo
+
+    def _resumo_atual(self):
+        """Hash dos bytes [0, lido) do arquivo como ele está agora."""
+        h = hashlib.blake2b()
+        restante = self.lido
+        with open(self.caminho, 'rb') as f:
+            while restante > 0:
+                bloco = f.read(min(TAMANHO_BLOCO, restante))
+                if not bloco:
+                    break
+                h.update(bloco)
+                restante -= len(bloco)
+        return h.digest()
+
+    def situacao(self):
+        """'igual', 'cresceu' (mesmo conteúdo já lido + linhas novas) ou 'mudou'."""
+        try:
+            estado = os.stat(self.caminho)
+        except FileNotFoundError:
+            return 'mudou'
+        if estado.st_mtime_ns == self.mtime and estado.st_size == self.lido:
+            return 'igual'
+        if estado.st_size < self.lido or self._resumo_atual() != self.resumo:
+            return 'mudou'
+        return 'cresceu' if estado.st_size > self.lido else 'igual'
+
+
+class DatasetMonitorado:
+    def __init__(self, caminho, padrao_particoes=None, intervalo=30):
+        self.caminho = caminho
+        self.padrao_particoes = padrao_particoes or os.path.splitext(caminho)[0] + '_*.csv'
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._forcar_completa = False
+
+        motor, self._arquivos = self._carregar_tudo()
+        if motor is None:
+            raise ValueError(f"{caminho}: nenhum CSV do dataset com cabeçalho completo")
+        # (motor, versão) trocados juntos, numa única atribuição
+        self._estado = (motor, 1)
+
+        if intervalo:
+            threading.Thread(target=self._monitorar, name='recarga-dataset', daemon=True).start()
+
+    @property
+    def motor(self):
+        return self._estado[0]
+
+    @property
+    def versao(self):
+        return self._estado[1]
+
+    def atual(self):
+        """(motor, versão) consistentes entre si, para um rerun inteiro."""
+        return self._estado
+
+    def _caminhos(self):
+        return [self.caminho] + sorted(p for p in glob.glob(self.padrao_particoes) if p != self.caminho)
+
+    def _carregar_tudo(self):
+        arquivos, partes = {}, []
+        for caminho in self._caminhos():
+            arquivo = arquivos[caminho] = ArquivoMonitorado(caminho)
+            conteudo = arquivo.ler_novas_linhas()
+            if arquivo.cabecalho:
+                partes.append(_ler_csv(arquivo.cabecalho, conteudo))
+
+        if not partes:
+            # Nenhum arquivo com cabeçalho completo (sendo criado ou recém-truncado pelo exportador)
+            return None, arquivos
+
+        df, relatorio = preparar(pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0])
+        print(f">> Dataset compactado: {relatorio['mb_original'].sum():.1f} MB -> {relatorio['mb'].sum():.1f} MB")
+        print(relatorio.to_string(float_format='{:.2f}'.format))
+        return MotorFiltros(df), arquivos
+
+    def verificar(self):
+        """Aplica as mudanças nos arquivos, se houver. Devolve 'igual', 'incremental' ou 'completa'."""
+        with self._lock:
+            caminhos = self._caminhos()
+            situacoes = {c: self._arquivos[c].situacao() for c in self._arquivos}
+            if self._forcar_completa or set(self._arquivos) - set(caminhos) or 'mudou' in situacoes.values():
+                motor, arquivos = self._carregar_tudo()
+                if motor is None:
+                    # Mantém o motor atual e tenta a recarga completa de novo no próximo ciclo
+                    self._forcar_completa = True
+                    print(">> Dataset sem cabeçalho completo (escrita em andamento?): recarga adiada")
+                    return 'igual'
+                self._arquivos = arquivos
+                self._forcar_completa = False
+                self._estado = (motor, self.versao + 1)
+                print(f">> Dataset recarregado por completo (versão {self.versao}): {len(motor.df)} linhas")
+                return 'completa'
+
+            try:
+                partes = []
+                for caminho in caminhos:
+                    if caminho not in self._arquivos:
+                        self._arquivos[caminho] = ArquivoMonitorado(caminho)
+                    elif situacoes[caminho] != 'cresceu':
+                        continue
+                    arquivo = self._arquivos[caminho]
+                    conteudo = arquivo.ler_novas_linhas()
+                    if conteudo:
+                        partes.append(_ler_csv(arquivo.cabecalho, conteudo))
+
+                if not partes:
+                    return 'igual'
+                novos, _ = preparar(pd.concat(partes, ignore_index=True))
+                motor = self.motor.anexar(novos)
+            except Exception:
+                # Os ponteiros de leitura já avançaram: a próxima verificação recarrega tudo
+                self._forcar_completa = True
+                raise
+            self._estado = (motor, self.versao + 1)
+            print(f">> Dataset atualizado (versão {self.versao}): +{len(novos)} linhas anexadas, {len(motor.df)} no total")
+            return 'incremental'
+
+    def _monitorar(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.verificar()
+            except Exception as e:
+                # Arquivo no meio de uma escrita, CSV malformado...: tenta de novo no próximo ciclo
+                print(f"[AVISO] Falha ao recarregar o dataset: {e}")
@@ -0,0 +1,62 @@
+import os
+
+from recarga_dataset import DatasetMonitorado
+
+CABECALHO = 'data_notificacao;municipio_nome;status_vacinal;resultado_teste_agregado;faixa_etaria;sintomas_texto\n'
+
+
+def _linhas(status, n, dia=1):
+    return ''.join(
+        f'2021-01-{dia:02d};Cidade {i % 3};{status};Positivo;Adulto (40-59);Febre, Tosse\n' for i in range(n)
+    )
+
+
+def _escrever(caminho, conteudo):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write(CABECALHO + conteudo)
+
+
+def _contagem_status(motor):
+    return motor.df['status_vacinal'].astype(str).value_counts().to_dict()
+
+
+def test_anexacao_quando_o_arquivo_so_cresce(tmp_path):
+    caminho = str(tmp_path / 'dataset.csv')
+    _escrever(caminho, _linhas('Parcial', 50))
+    dataset = DatasetMonitorado(caminho, intervalo=0)
+
+    _escrever(caminho, _linhas('Parcial', 50) + _linhas('Não Vacinado', 10, dia=2))
+
+    assert dataset.verificar() == 'incremental'
+    assert _contagem_status(dataset.motor) == {'Parcial': 50, 'Não Vacinado': 10}
+    assert dataset.verificar() == 'igual'
+
+
+def test_reescrita_do_mesmo_tamanho_no_inicio_recarrega_tudo(tmp_path):
+    # Linhas antigas corrigidas sem mudar o tamanho, longe do fim do trecho já
+    # lido, e linhas novas no final: não pode virar anexação
+    caminho = str(tmp_path / 'dataset.csv')
+    antigas = _linhas('Esquema Completo', 20) + _linhas('Parcial', 500)
+    _escrever(caminho, antigas)
+    dataset = DatasetMonitorado(caminho, intervalo=0)
+
+    corrigidas = _linhas('Esquema Complet0', 20) + _linhas('Parcial', 500)
+    assert len(corrigidas) == len(antigas)
+    _escrever(caminho, corrigidas + _linhas('Não Vacinado', 10, dia=2))
+
+    assert dataset.verificar() == 'completa'
+    assert _contagem_status(dataset.motor) == {'Esquema Complet0': 20, 'Parcial': 500, 'Não Vacinado': 10}
+
+
+def test_reescrita_do_mesmo_tamanho_sem_linhas_novas(tmp_path):
+    caminho = str(tmp_path / 'dataset.csv')
+    _escrever(caminho, _linhas('Esquema Completo', 20))
+    dataset = DatasetMonitorado(caminho, intervalo=0)
+
+    _escrever(caminho, _linhas('Esquema Complet0', 20))
+    # Garante outro mtime mesmo com relógio de baixa resolução
+    mtime = os.stat(caminho).st_mtime_ns + 1_000_000_000
+    os.utime(caminho, ns=(mtime, mtime))
+
+    assert dataset.verificar() == 'completa'
+    assert _contagem_status(dataset.motor) == {'Esquema Complet0': 20}
@@ -0,0 +1,313 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmark_sql import CLASSIFICACOES, LABORATORIOS, PERIODO_FIM, PERIODO_INICIO, RACAS, SEXOS, SINTOMAS
+from limpeza import aplicar_regras_negocio
+import modelo_confirmacao
+
+try:
+    import resource
+except ImportError:  # Windows: RSS não é medido
+    resource = None
+
+# ==============================================================================
+# TESTE DE CARGA DO DASHBOARD (SESSÕES SIMULTÂNEAS)
+# ==============================================================================
+# Gera datasets sintéticos no formato exportado pelo limpeza.py e roda o app.py
+# sem navegador (streamlit.testing AppTest), com N sessões aplicando sequências
+# aleatórias de filtros da sidebar e trocas de seção. Cada cenário (linhas x
+# sessões) roda em processos novos, com caches frios, e informa a latência dos
+# reruns (p50/p95), a vazão e o pico de memória (RSS) de cada processo:
+#
+#   python teste_carga.py --linhas 50000 200000 --sessoes 1 4 8 --interacoes 30
+#
+# O AppTest troca o Runtime global do Streamlit a cada execução, então dentro de
+# um processo as sessões rodam em SEQUÊNCIA: se alternam rerun a rerun (em ordem
+# aleatória) compartilhando os caches, mas nunca há dois reruns ao mesmo tempo.
+# A simultaneidade vem só dos processos: por padrão cada sessão tem o seu
+# (--processos menor junta sessões sequenciais no mesmo processo). Cada processo
+# tem seus próprios caches, então a disputa entre threads de um mesmo servidor
+# (lock do LRU do MotorFiltros, construção deduplicada do CacheFiguras e do
+# CacheTTL) não é exercitada aqui. O relatório traz os reruns simultâneos
+# (= processos) ao lado das sessões, para o p95 não ser lido como o de N
+# sessões concorrentes num servidor.
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_DATASET = 'df_padronizado_para_o_dash.csv'
+TIMEOUT_RERUN = 300
+
+# Os filtros padrão do app.py usam os três primeiros
+MUNICIPIOS_PA = ['Belém', 'Tucuruí', 'Conceição do Araguaia', 'Ananindeua', 'Santarém', 'Marabá',
+                 'Parauapebas', 'Castanhal', 'Abaetetuba', 'Cametá', 'Bragança', 'Altamira']
+
+# Ação de interação -> peso no sorteio
+ACOES = {'secao': 0.5, 'municipios': 0.3, 'periodo': 0.2}
+
+
+def _agregar_distintos(rng, valores, qtd, separador):
+    """STRING_AGG(DISTINCT ...) de até 2 valores sorteados por linha (None quando qtd == 0)."""
+    a = pd.Series(rng.choice(valores, len(qtd)))
+    b = pd.Series(rng.choice(valores, len(qtd)))
+    menor, maior = a.where(a <= b, b), a.where(a > b, b)
+    texto = menor.where((qtd < 2) | (a == b), menor + separador + maior)
+    return texto.where(qtd > 0, None)
+
+
+def gerar_dataset_dashboard(n_linhas, semente=42, n_municipios=144):
+    """Dataset no formato do CSV do Dashboard (mesmas colunas e valores da query_exportacao)."""
+    rng = np.random.default_rng(semente)
+    nomes = MUNICIPIOS_PA + [f'Município {i:03d}' for i in range(len(MUNICIPIOS_PA), n_municipios)]
+    nomes = np.array(nomes[:n_municipios], dtype=object)
+
+    # Distribuição desigual entre municípios (poucos concentram a maioria, como na base real)
+    pesos = 1.0 / np.arange(1, len(nomes) + 1)
+    dias_periodo = (PERIODO_FIM - PERIODO_INICIO).days
+    data_not = pd.to_datetime(PERIODO_INICIO) + pd.to_timedelta(rng.integers(0, dias_periodo, n_linhas), unit='D')
+    municipio = rng.choice(len(nomes), n_linhas, p=pesos / pesos.sum())
+
+    # Sintomas: cada combinação vira um texto só uma vez (STRING_AGG ordenado por nome)
+    sintomas = sorted(SINTOMAS)
+    presentes = rng.random((n_linhas, len(sintomas))) < 0.2
+    combinacao = presentes @ (1 << np.arange(len(sintomas)))
+    textos = {c: ', '.join(s for i, s in enumerate(sintomas) if c >> i & 1) or 'Assintomático/Não Informado'
+              for c in np.unique(combinacao)}
+    flag = lambda nome: presentes[:, sintomas.index(nome)].astype(float)
+
+    doses = rng.choice([0, 1, 2], n_linhas, p=[0.4, 0.2, 0.4])
+    testes = rng.integers(0, 3, n_linhas)
+    positivo = (rng.random(n_linhas) < 1 - 0.8 ** testes) & (testes > 0)
+
+    df = pd.DataFrame({
+        'notificacao_id': np.arange(1, n_linhas + 1),
+        'data_notificacao': data_not.date,
+        'codigo_ibge': 1500000 + municipio * 10,
+        'municipio_nome': nomes[municipio],
+        'uf_sigla': 'PA',
+        'idade': rng.integers(0, 100, n_linhas).astype(float),
+        'sexo': rng.choice(SEXOS, n_linhas),
+        'raca_cor': rng.choice(RACAS, n_linhas),
+        'is_profissional_saude': rng.choice(['Sim', 'Não'], n_linhas, p=[0.08, 0.92]),
+        'classificacao_final': rng.choice(np.array(CLASSIFICACOES, dtype=object), n_linhas),
+        'sintomas_texto': pd.Series(combinacao).map(textos),
+        'flg_febre': flag('Febre'),
+        'flg_tosse': flag('Tosse'),
+        'flg_dispneia': flag('Dispneia'),
+        'doses_vacina': doses,
+        'fabricantes_vacina': _agregar_distintos(rng, LABORATORIOS, doses, ' / '),
+        'status_vacinal': np.select([doses >= 2, doses == 1], ['Esquema Completo', 'Parcial'], 'Não Vacinado'),
+        'testes_realizados': testes,
+        'tipos_testes_lista': _agregar_distintos(rng, [str(t) for t in range(1, 7)], testes, ', '),
+        'fabricantes_teste_lista': _agregar_distintos(rng, [str(c) for c in range(100, 130)], testes, ', '),
+        'resultado_teste_agregado': np.select([positivo, testes > 0], ['Positivo', 'Negativo/Inconclusivo'], 'Não Testado'),
+    })
+    return aplicar_regras_negocio(df)
+
+
+def preparar_cenario(diretorio, n_linhas, semente):
+    """Diretório com o CSV sintético e o modelo treinado (reaproveitado entre execuções)."""
+    pasta = os.path.join(diretorio, f'dash_{n_linhas}_{semente}')
+    caminho = os.path.join(pasta, ARQUIVO_DATASET)
+    if not os.path.exists(caminho):
+        os.makedirs(pasta, exist_ok=True)
+        print(f">> Gerando dataset sintético com {n_linhas} linhas em {pasta}...")
+        df = gerar_dataset_dashboard(n_linhas, semente)
+        modelo = modelo_confirmacao.ModeloConfirmacao(modelo_confirmacao.treinar(df))
+        modelo.salvar(os.path.join(pasta, modelo_confirmacao.ARQUIVO_MODELO))
+        # Escrita atômica: um cenário interrompido não deixa CSV pela metade
+        df.to_csv(caminho + '.tmp', index=False, sep=';', encoding='utf-8')
+        os.replace(caminho + '.tmp', caminho)
+    return pasta
+
+
+def _rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss: KB no Linux, bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
+
+
+def _interagir(at, rng, periodo):
+    """Aplica uma ação aleatória da sidebar/navegação e devolve o nome dela."""
+    acao = rng.choices(list(ACOES), weights=list(ACOES.values()))[0]
+    if acao == 'secao':
+        radio = at.radio(key='secao')
+        radio.set_value(rng.choice([s for s in radio.options if s != radio.value]))
+    elif acao == 'municipios':
+        seletor = at.sidebar.multiselect[0]
+        seletor.set_value(rng.sample(seletor.options, min(rng.choice([0, 1, 1, 2, 3]), len(seletor.options))))
+    elif periodo is not None:
+        inicio, fim = periodo
+        a = rng.randint(0, (fim - inicio).days)
+        b = rng.randint(a, (fim - inicio).days)
+        at.sidebar.date_input[0].set_value((inicio + timedelta(days=a), inicio + timedelta(days=b)))
+    return acao
+
+
+def executar_sessoes(pasta, n_sessoes, interacoes, semente, backend):
+    """Processo de trabalho: n_sessoes do app.py intercaladas, um rerun por vez. Devolve as medições."""
+    os.chdir(pasta)
+    os.environ['DASHBOARD_BACKEND'] = backend
+    os.environ['DASHBOARD_RECARGA_INTERVALO'] = '0'
+    sys.path.insert(0, RAIZ)
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(semente)
+    sessoes, cargas, erros = [], [], []
+    for _ in range(n_sessoes):
+        at = AppTest.from_file(os.path.join(RAIZ, 'app.py'), default_timeout=TIMEOUT_RERUN)
+        inicio = time.perf_counter()
+        at.run()
+        cargas.append((time.perf_counter() - inicio) * 1000)
+        if at.exception:
+            erros.append(f"carga: {at.exception[0].message}")
+        sessoes.append(at)
+    rss_carga = _rss_mb()
+
+    periodo = None
+    if sessoes and sessoes[0].sidebar.date_input:
+        periodo = tuple(sessoes[0].sidebar.date_input[0].value)
+
+    # Ordem aleatória entre as sessões, cada uma com o mesmo número de reruns
+    ordem = [i for i in range(n_sessoes) for _ in range(interacoes)]
+    rng.shuffle(ordem)
+
+    reruns = []
+    inicio_fase = time.perf_counter()
+    for i in ordem:
+        at = sessoes[i]
+        if at.exception:
+            continue
+        acao = _interagir(at, rng, periodo)
+        inicio = time.perf_counter()
+        at.run()
+        ms = (time.perf_counter() - inicio) * 1000
+        if at.exception:
+            erros.append(f"{acao}: {at.exception[0].message}")
+        reruns.append({'sessao': i, 'acao': acao, 'secao': at.radio(key='secao').value, 'ms': ms})
+
+    return {
+        'pid': os.getpid(),
+        'sessoes': n_sessoes,
+        'cargas_ms': cargas,
+        'reruns': reruns,
+        'duracao_s': time.perf_counter() - inicio_fase,
+        'erros': erros,
+        'rss_carga_mb': rss_carga,
+        'rss_pico_mb': _rss_mb(),
+    }
+
+
+def rodar_cenario(pasta, n_sessoes, processos, interacoes, semente, backend):
+    """Divide as sessões entre processos novos (caches frios) e junta as medições.
+
+    Só os processos rodam em paralelo: as sessões de um mesmo processo são sequenciais.
+    processos=None usa um processo por sessão.
+    """
+    processos = max(1, min(processos or n_sessoes, n_sessoes))
+    divisao = [n_sessoes // processos + (p < n_sessoes % processos) for p in range(processos)]
+    tarefas = [(pasta, n, interacoes, semente + p, backend) for p, n in enumerate(divisao)]
+    with multiprocessing.get_context('spawn').Pool(processos) as pool:
+        resultados = pool.starmap(executar_sessoes, tarefas)
+
+    reruns = pd.DataFrame([r for res in resultados for r in res['reruns']], columns=['sessao', 'acao', 'secao', 'ms'])
+    latencias = reruns['ms'].to_numpy()
+    cargas = np.array([c for res in resultados for c in res['cargas_ms']])
+    duracao = max(res['duracao_s'] for res in resultados)
+    percentil = lambda valores, p: float(np.percentile(valores, p)) if len(valores) else float('nan')
+
+    return {
+        'sessoes': n_sessoes,
+        'processos': processos,
+        # Reruns que podem acontecer ao mesmo tempo; o resto das sessões espera a vez no seu processo
+        'reruns_simultaneos': processos,
+        'sessoes_sequenciais_por_processo': max(divisao),
+        'reruns': len(latencias),
+        'erros': [e for res in resultados for e in res['erros']],
+        'p50_ms': percentil(latencias, 50),
+        'p95_ms': percentil(latencias, 95),
+        'max_ms': float(latencias.max()) if len(latencias) else float('nan'),
+        'reruns_por_s': len(latencias) / duracao if duracao else float('nan'),
+        'carga_p50_ms': percentil(cargas, 50),
+        'carga_max_ms': float(cargas.max()) if len(cargas) else float('nan'),
+        'por_secao': {
+            secao: {'reruns': len(g), 'p50_ms': percentil(g['ms'], 50), 'p95_ms': percentil(g['ms'], 95)}
+            for secao, g in reruns.groupby('secao')
+        },
+        'processos_rss': [
+            {'pid': res['pid'], 'sessoes': res['sessoes'], 'rss_carga_mb': res['rss_carga_mb'], 'rss_pico_mb': res['rss_pico_mb']}
+            for res in resultados
+        ],
+    }
+
+
+def imprimir_resultados(cenarios):
+    print(f"\n{'Linhas':>9}{'Sessões':>9}{'Simult.':>9}{'Seq./proc.':>12}{'Reruns':>8}{'Erros':>7}{'p50 ms':>9}"
+          f"{'p95 ms':>9}{'máx ms':>9}{'reruns/s':>10}{'carga p50':>11}{'RSS pico MB':>13}")
+    print("-" * 115)
+    for c in cenarios:
+        rss = [p['rss_pico_mb'] for p in c['processos_rss'] if p['rss_pico_mb'] is not None]
+        print(f"{c['linhas']:>9}{c['sessoes']:>9}{c['reruns_simultaneos']:>9}{c['sessoes_sequenciais_por_processo']:>12}"
+              f"{c['reruns']:>8}{len(c['erros']):>7}{c['p50_ms']:>9.0f}{c['p95_ms']:>9.0f}{c['max_ms']:>9.0f}"
+              f"{c['reruns_por_s']:>10.2f}{c['carga_p50_ms']:>11.0f}{(max(rss) if rss else float('nan')):>13.0f}")
+    print("Simult. = processos (reruns ao mesmo tempo); Seq./proc. = sessões que se revezam, uma por vez, "
+          "em cada processo.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do Dashboard com sessões simultâneas.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[50000], help="Tamanhos de dataset a testar")
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 4], help="Sessões a testar")
+    parser.add_argument('--processos', type=int,
+                        help="Processos entre os quais as sessões são divididas; só os processos rodam em paralelo, "
+                             "as sessões de um mesmo processo são sequenciais (padrão: um por sessão)")
+    parser.add_argument('--interacoes', type=int, default=20, help="Reruns (mudanças de filtro/seção) por sessão")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'], default='pandas')
+    parser.add_argument('--diretorio', default='teste_carga_dados', help="Onde ficam os datasets sintéticos")
+    parser.add_argument('--saida', help="Arquivo JSON com as medições de todos os cenários")
+    args = parser.parse_args()
+
+    cenarios = []
+    for n_linhas in args.linhas:
+        pasta = preparar_cenario(os.path.abspath(args.diretorio), n_linhas, args.semente)
+        for n_sessoes in args.sessoes:
+            print(f">> Cenário: {n_linhas} linhas, {n_sessoes} sessões, {args.interacoes} reruns por sessão...")
+            cenario = {'linhas': n_linhas, **rodar_cenario(pasta, n_sessoes, args.processos, args.interacoes,
+                                                          args.semente, args.backend)}
+            print(f"   -> {cenario['reruns_simultaneos']} processos em paralelo, até "
+                  f"{cenario['sessoes_sequenciais_por_processo']} sessões sequenciais em cada | "
+                  f"p50 {cenario['p50_ms']:.0f} ms | p95 {cenario['p95_ms']:.0f} ms | "
+                  f"{cenario['reruns_por_s']:.2f} reruns/s")
+            for erro in cenario['erros'][:5]:
+                print(f"   [ERRO] {erro}")
+            cenarios.append(cenario)
+
+    imprimir_resultados(cenarios)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({
+                'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                'backend': args.backend,
+                'interacoes': args.interacoes,
+                'semente': args.semente,
+                'cenarios': cenarios,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n>> Medições salvas em {args.saida}")
+
+    if any(c['erros'] for c in cenarios):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+-- ============================================================================
+-- ETAPA 3.3: VIEWS MATERIALIZADAS (LEITURA PRÉ-CALCULADA PARA O DASHBOARD)
+-- ============================================================================
+-- As views de views.sql reagregam todas as notificações a cada leitura.
+-- Aqui guardamos o mesmo resultado em disco. Cada view materializada tem um
+-- índice ÚNICO, requisito do REFRESH MATERIALIZED VIEW CONCURRENTLY, que
+-- atualiza os dados sem bloquear quem está lendo (o BI continua consultando a
+-- versão anterior até o refresh terminar).
+--
+-- Atualização: python atualizar_views.py (executado também ao final do insercao.py)
+
+-- 1. CASOS POR MUNICÍPIO
+-- Incluímos o código IBGE para garantir unicidade (nomes podem se repetir entre UFs).
+-- A UF vem do município (m.estado_ibge, como no vw_casos_diarios), e não da
+-- notificação: assim (municipio_ibge, data_notificacao) identifica a linha e o
+-- índice único não quebra quando a notificação traz outro estado_notificacao_ibge.
+CREATE MATERIALIZED VIEW IF NOT EXISTS mvw_casos_por_municipio AS
+SELECT
+    m.municipio_ibge,
+    m.nome AS municipio,
+    e.sigla AS uf,
+    n.data_notificacao,
+    COUNT(n.notificacao_id) AS total_notificacoes,
+    COUNT(n.notificacao_id) FILTER (
+        WHERE c.classificacao_final ILIKE '%Confirmado%'
+           OR c.classificacao_final ILIKE '%Laboratorial%'
+    ) AS casos_confirmados,
+    COUNT(n.notificacao_id) FILTER (
+        WHERE c.classificacao_final ILIKE '%Descartado%'
+    ) AS casos_descartados,
+    COUNT(n.notificacao_id) FILTER (
+        WHERE c.evolucao_caso ILIKE '%Óbito%'
+           OR c.evolucao_caso ILIKE '%Falecimento%'
+    ) AS obitos
+FROM notificacao n
+JOIN municipio m ON n.municipio_notificacao_ibge = m.municipio_ibge
+JOIN estado e ON m.estado_ibge = e.estado_ibge
+JOIN dados_clinicos c ON n.notificacao_id = c.notificacao_id
+WHERE n.excluido = FALSE
+GROUP BY m.municipio_ibge, m.nome, e.sigla, n.data_notificacao
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_mvw_casos_municipio_data
+    ON mvw_casos_por_municipio (municipio_ibge, data_notificacao);
+-- Índice para o filtro de período do Dashboard
+CREATE INDEX IF NOT EXISTS idx_mvw_casos_data
+    ON mvw_casos_por_municipio (data_notificacao);
+
+-- 2. VACINAÇÃO POR RESULTADO
+CREATE MATERIALIZED VIEW IF NOT EXISTS mvw_vacinacao_por_resultado AS
+WITH doses_calculadas AS (
+    SELECT notificacao_id, COUNT(*) as qtd_doses
+    FROM vacina_aplicada
+    GROUP BY notificacao_id
+)
+SELECT
+    CASE
+        WHEN d.qtd_doses IS NULL OR d.qtd_doses = 0 THEN 'Não Vacinado'
+        WHEN d.qtd_doses = 1 THEN 'Parcial (1 Dose)'
+        WHEN d.qtd_doses >= 2 THEN 'Esquema Completo'
+    END AS status_vacinal,
+    COALESCE(c.classificacao_final, 'Em Análise') as classificacao,
+    COALESCE(c.evolucao_caso, 'Em Tratamento/Ignorado') as evolucao,
+    COUNT(*) AS total_pacientes
+FROM notificacao n
+JOIN dados_clinicos c ON n.notificacao_id = c.notificacao_id
+LEFT JOIN doses_calculadas d ON n.notificacao_id = d.notificacao_id
+WHERE n.excluido = FALSE
+GROUP BY 1, 2, 3
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_mvw_vacinacao_status_classif_evol
+    ON mvw_vacinacao_por_resultado (status_vacinal, classificacao, evolucao);
+
+-- 3. SINTOMAS FREQUENTES
+-- Sem ORDER BY: a ordenação fica para a consulta de leitura.
+CREATE MATERIALIZED VIEW IF NOT EXISTS mvw_sintomas_frequentes AS
+SELECT
+    s.nome AS sintoma,
+    COUNT(*) AS frequencia_total,
+    COUNT(*) FILTER (
+        WHERE c.classificacao_final ILIKE '%Confirmado%'
+           OR c.classificacao_final ILIKE '%Laboratorial%'
+    ) AS frequencia_em_confirmados
+FROM notificacao_sintoma ns
+JOIN sintoma s ON ns.sintoma_id = s.sintoma_id
+JOIN dados_clinicos c ON ns.notificacao_id = c.notificacao_id
+JOIN notificacao n ON ns.notificacao_id = n.notificacao_id
+WHERE n.excluido = FALSE
+GROUP BY s.nome
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_mvw_sintomas_sintoma
+    ON mvw_sintomas_frequentes (sintoma);